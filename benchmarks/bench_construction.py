@@ -0,0 +1,34 @@
+"""Element construction time for each attribute style.
+
+Run with `python benchmarks/bench_construction.py`.
+"""
+import os
+import sys
+import timeit
+
+# run from a checkout without installing chope
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chope import div
+
+CASES = {
+    "no attributes": lambda: div["text"],
+    "selector": lambda: div("#main.content.wide")["text"],
+    "tuple": lambda: div("data-x", "1", "aria-label", "Main")["text"],
+    "kwargs": lambda: div(id="main", class_="content", title="Main")["text"],
+    "mixed": lambda: div("#main.content", "data-x", "1", title="Main")["text"],
+    "override with call": lambda: ELEMENT(title="Other", class_="wide"),
+}
+
+ELEMENT = div("#main.content", title="Main")["text"]
+
+
+def main() -> None:
+    for name, build in CASES.items():
+        number = 100000
+        best = min(timeit.repeat(build, number=number, repeat=5))
+        print(f"{name:<20} {best / number * 1e6:>7.3f} us/element")
+
+
+if __name__ == "__main__":
+    main()
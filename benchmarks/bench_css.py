@@ -0,0 +1,59 @@
+"""Render time of a large stylesheet, alone and embedded in a page.
+
+Run with `python benchmarks/bench_css.py`. Rules without variables are only
+serialized on the first render, so the later renders should take about the
+same time whatever the number of rules.
+"""
+import os
+import sys
+import timeit
+
+# run from a checkout without installing chope
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chope import body, head, html, style
+from chope.css import Css, em, px
+from chope.variable import Var
+
+
+def stylesheet(rules: int, variables: int) -> Css:
+    return Css[
+        [
+            slice(
+                f".c{i}",
+                dict(
+                    font_size=px / i,
+                    margin_top=em / 1,
+                    color=Var(f"color-{i}", "red") if i < variables else "red",
+                    border=(px / 1, "solid", "black"),
+                ),
+            )
+            for i in range(rules)
+        ]
+    ]
+
+
+def main() -> None:
+    for rules in (100, 1000, 5000):
+        for variables in (0, 10):
+            css = stylesheet(rules, variables)
+            page = html[head[style[css]], body["text"]]
+            first = min(
+                timeit.repeat(
+                    lambda: stylesheet(rules, variables).render(), number=1, repeat=3
+                )
+            )
+            again = min(timeit.repeat(lambda: css.render(), number=10, repeat=3)) / 10
+            embedded = (
+                min(timeit.repeat(lambda: page.render(), number=10, repeat=3)) / 10
+            )
+            print(
+                f"{rules:>5} rules {variables:>3} with vars"
+                f"  build+first {first * 1e3:>8.2f} ms"
+                f"  again {again * 1e3:>7.3f} ms"
+                f"  in page {embedded * 1e3:>7.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
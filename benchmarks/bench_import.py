@@ -0,0 +1,58 @@
+"""Time taken by `import chope`, measured with `python -X importtime`.
+
+Run with `python benchmarks/bench_import.py [runs]`. Every run is a fresh
+interpreter; the best run is reported, along with the modules that took the
+most time in it. Bytecode is written on a first run and then used, as for an
+installed package.
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = ("import chope", "from chope import *", "from chope import div")
+
+
+def importtime(statement: str) -> Dict[str, Tuple[int, int]]:
+    # `-X importtime` writes "import time: self | cumulative | module" lines
+    # to stderr, in microseconds
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    # import chope from this checkout, installed or not
+    env["PYTHONPATH"] = ROOT
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        env=env,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        self_us, cumulative_us, module = line.split(":", 1)[1].split("|")
+        if self_us.strip().isdigit():
+            times[module.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    importtime("import chope")
+
+    for statement in STATEMENTS:
+        best: List[Dict[str, Tuple[int, int]]] = sorted(
+            (importtime(statement) for _ in range(runs)),
+            key=lambda times: times["chope"][1],
+        )
+        times = best[0]
+        slowest = sorted(times.items(), key=lambda item: -item[1][0])[:5]
+        print(f"{statement:<24} {times['chope'][1] / 1e3:>7.2f} ms")
+        for module, (self_us, _) in slowest:
+            print(f"    {module:<30} {self_us / 1e3:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
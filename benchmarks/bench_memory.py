@@ -0,0 +1,54 @@
+"""Memory used by element trees, in bytes per node.
+
+Run with `python benchmarks/bench_memory.py`. Only the nodes are counted:
+the cell text is created before measuring starts.
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+# run from a checkout without installing chope
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chope import table, td, tr
+from chope.variable import Var
+
+
+def measure(name: str, build, nodes: int) -> None:
+    gc.collect()
+    tracemalloc.start()
+    tree = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<24} {nodes:>8} nodes  {size / nodes:>7.1f} bytes/node")
+    del tree
+
+
+def main() -> None:
+    rows, cols = 20000, 10
+    texts = [f"{i}" for i in range(cols)]
+    nodes = rows * (cols + 1) + 1
+
+    measure(
+        "plain cells",
+        lambda: table[[tr[[td[text] for text in texts]] for _ in range(rows)]],
+        nodes,
+    )
+    measure(
+        "cells with attributes",
+        lambda: table[
+            [tr[[td(class_="cell")[text] for text in texts]] for _ in range(rows)]
+        ],
+        nodes,
+    )
+    measure(
+        "cells with variables",
+        lambda: table[[tr[[td[Var(text)] for text in texts]] for _ in range(rows)]],
+        nodes,
+    )
+
+
+if __name__ == "__main__":
+    main()
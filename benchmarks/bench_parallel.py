@@ -0,0 +1,48 @@
+"""Serial render against `render_parallel()` on a process pool.
+
+Run with `python benchmarks/bench_parallel.py [workers]`. The speed-up depends
+on the number of cores; with one core the parallel render is only slower.
+"""
+import os
+import sys
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+
+# run from a checkout without installing chope
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chope import section, table, td, tr
+
+
+def report(rows: int) -> section:
+    return section[
+        table[
+            [
+                tr(id=f"row-{i}")[[td(class_="cell")[f"{i}-{j}"] for j in range(10)]]
+                for i in range(rows)
+            ]
+        ]
+    ]
+
+
+def main() -> None:
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for rows in (1000, 10000, 50000):
+            page = report(rows)
+            serial = min(timeit.repeat(lambda: page.render(), number=1, repeat=3))
+            parallel = min(
+                timeit.repeat(
+                    lambda: page.render_parallel(executor), number=1, repeat=3
+                )
+            )
+            print(
+                f"{rows:>6} rows  serial {serial * 1e3:>9.1f} ms"
+                f"  parallel ({workers} workers) {parallel * 1e3:>9.1f} ms"
+                f"  x{serial / parallel:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Render time against tree depth and node count.
+
+Run with `python benchmarks/bench_render.py`. The time per output byte should
+not grow along either series; if it does, rendering has stopped being linear.
+With indentation on, the output of a deep tree grows with depth * nodes, so
+the time per node is expected to grow there.
+"""
+import os
+import sys
+import timeit
+
+# run from a checkout without installing chope
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chope import div, span, table, td, tr
+
+
+def deep_tree(depth: int) -> div:
+    element = span["leaf"]
+    for _ in range(depth):
+        element = div(id="node")[element, "text"]
+
+    return element
+
+
+def wide_tree(rows: int) -> table:
+    return table[
+        [tr[[td(class_="cell")[f"{i}-{j}"] for j in range(10)]] for i in range(rows)]
+    ]
+
+
+def measure(element, nodes: int, indent: int, repeat: int = 5) -> None:
+    number = max(1, 20000 // nodes)
+    best = min(
+        timeit.repeat(lambda: element.render(indent), number=number, repeat=repeat)
+    )
+    per_render = best / number
+    size = len(element.render(indent))
+    print(
+        f"{nodes:>8} nodes  {size:>10} bytes  {per_render * 1e3:>9.3f} ms/render"
+        f"  {per_render / nodes * 1e6:>7.3f} us/node"
+        f"  {per_render / size * 1e9:>7.2f} ns/byte"
+    )
+
+
+def main() -> None:
+    for indent in (2, 0):
+        print(f"depth series (indent={indent})")
+        for depth in (100, 200, 400, 800, 1600, 3200):
+            measure(deep_tree(depth), depth + 1, indent)
+
+        print(f"width series (indent={indent})")
+        for rows in (100, 200, 400, 800, 1600, 3200):
+            measure(wide_tree(rows), rows * 11 + 1, indent)
+
+
+if __name__ == "__main__":
+    main()
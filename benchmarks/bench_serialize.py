@@ -0,0 +1,65 @@
+"""Building a page and compiling it against loading them from a file.
+
+Run with `python benchmarks/bench_serialize.py`. Loading should take a
+fraction of the time of building, and much less than compiling.
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+# run from a checkout without installing chope
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chope import body, div, h1, head, html, span, style, title
+from chope.css import Css, px
+from chope.serialize import dump, load
+from chope.variable import Var
+
+
+def page(rows: int) -> html:
+    return html[
+        head[
+            title[Var("title", "Report")],
+            style[Css["h1": dict(color=Var("color", "black"), font_size=px / 20)]],
+        ],
+        body[
+            h1[Var("title", "Report")],
+            [
+                div(class_="row", id=f"row-{i}")[
+                    span[f"item {i}"], Var(f"value-{i}", i)
+                ]
+                for i in range(rows)
+            ],
+        ],
+    ]
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        tree_path = os.path.join(tmp, "tree.chope")
+        template_path = os.path.join(tmp, "template.chope")
+
+        for rows in (100, 1000, 10000):
+            dump(page(rows), tree_path)
+            dump(page(rows).compile(), template_path)
+
+            build = min(timeit.repeat(lambda: page(rows), number=1, repeat=5))
+            loaded = min(timeit.repeat(lambda: load(tree_path), number=1, repeat=5))
+            compile = min(
+                timeit.repeat(lambda: page(rows).compile(), number=1, repeat=5)
+            )
+            compiled = min(
+                timeit.repeat(lambda: load(template_path), number=1, repeat=5)
+            )
+            print(
+                f"{rows:>6} rows  build {build * 1e3:>8.2f} ms"
+                f"  load {loaded * 1e3:>8.2f} ms"
+                f"  build+compile {compile * 1e3:>8.2f} ms"
+                f"  load compiled {compiled * 1e3:>8.2f} ms"
+                f"  ({os.path.getsize(template_path) // 1024} KiB)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Benchmark suite for the hot paths, with a baseline to compare against.
+
+Run the suite and save its results:
+
+    python benchmarks/suite.py run --output results.json
+
+Timings depend on the machine, so record a baseline on the machine it is
+compared on, e.g. on the main branch before a change, and compare against it
+afterwards; the exit status is 1 if a benchmark got slower, or a tree bigger,
+by more than the threshold:
+
+    python benchmarks/suite.py run --output baseline.json
+    python benchmarks/suite.py compare baseline.json results.json
+    python benchmarks/suite.py compare baseline.json  # runs the suite
+
+Every benchmark reports operations per second, the best of several repeats.
+Benchmarks over trees of growing size also report memory per node and how the
+time per node scales with size.
+"""
+import argparse
+import functools
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# run from a checkout without installing chope
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chope import div, span, table, td, tr
+from chope.css import Css, em, px
+from chope.variable import Var
+
+
+class Case(NamedTuple):
+    name: str
+    series: str
+    size: int
+    setup: Callable[[], Any]
+    run: Callable[[Any], Any]
+    nodes: int = 0
+    # whether every call needs a subject from a new `setup()`, for operations
+    # that cache their result on the subject
+    fresh: bool = False
+
+
+def deep_tree(depth: int) -> div:
+    element = span["leaf"]
+    for _ in range(depth):
+        element = div(id="node")[element, "text"]
+
+    return element
+
+
+def wide_tree(rows: int) -> table:
+    return table[
+        [tr[[td(class_="cell")[f"{i}-{j}"] for j in range(10)]] for i in range(rows)]
+    ]
+
+
+def var_tree(rows: int, density: float) -> table:
+    # one cell in every `1 / density` holds a variable
+    every = round(1 / density) if density else 0
+
+    def cell(i: int, j: int) -> td:
+        return td[Var(f"v{j}", j)] if every and (i * 10 + j) % every == 0 else td["x"]
+
+    return table[[tr[[cell(i, j) for j in range(10)]] for i in range(rows)]]
+
+
+def stylesheet(rules: int, variables: int = 0) -> Css:
+    return Css[
+        [
+            slice(
+                f".c{i}",
+                dict(
+                    font_size=px / i,
+                    margin_top=em / 1,
+                    color=Var(f"color-{i}", "red") if i < variables else "red",
+                    border=(px / 1, "solid", "black"),
+                ),
+            )
+            for i in range(rules)
+        ]
+    ]
+
+
+def cases() -> Iterator[Case]:
+    for style, build in (
+        ("selector", lambda _: div("#main.content.wide")["text"]),
+        ("tuple", lambda _: div("id", "main", "class", "content wide")["text"]),
+        ("kwargs", lambda _: div(id="main", class_="content wide")["text"]),
+    ):
+        yield Case(f"construct/{style}", "construct", 1, lambda: None, build)
+
+    for indent in (2, 0):
+        for depth in (10, 100, 1000):
+            yield Case(
+                f"render/depth/indent={indent}/{depth}",
+                f"render/depth/indent={indent}",
+                depth,
+                lambda depth=depth: deep_tree(depth),
+                lambda tree, indent=indent: tree.render(indent),
+                depth + 1,
+            )
+        for rows in (10, 100, 1000):
+            yield Case(
+                f"render/width/indent={indent}/{rows}",
+                f"render/width/indent={indent}",
+                rows,
+                lambda rows=rows: wide_tree(rows),
+                lambda tree, indent=indent: tree.render(indent),
+                rows * 11 + 1,
+            )
+
+    for density in (0.0, 0.1, 0.5, 1.0):
+        for rows in (100, 1000):
+            setup = functools.partial(var_tree, rows, density)
+            nodes = rows * 11 + 1
+            yield Case(
+                f"get_vars/density={density}/{rows}",
+                f"get_vars/density={density}",
+                rows,
+                setup,
+                lambda tree: tree.get_vars(),
+                nodes,
+                fresh=True,
+            )
+            yield Case(
+                f"set_vars/density={density}/{rows}",
+                f"set_vars/density={density}",
+                rows,
+                setup,
+                lambda tree: tree.set_vars({"v0": "a", "v5": "b"}),
+                nodes,
+            )
+
+    for variables in (0, 10):
+        for rules in (100, 1000, 5000):
+            yield Case(
+                f"css/first/vars={variables}/{rules}",
+                f"css/first/vars={variables}",
+                rules,
+                lambda rules=rules, variables=variables: (rules, variables),
+                lambda args: stylesheet(*args).render(),
+            )
+            yield Case(
+                f"css/again/vars={variables}/{rules}",
+                f"css/again/vars={variables}",
+                rules,
+                lambda rules=rules, variables=variables: stylesheet(rules, variables),
+                lambda css: css.render(),
+            )
+
+
+def time_case(case: Case, repeat: int) -> float:
+    if case.fresh:
+        best = float("inf")
+        for _ in range(repeat * 5):
+            subject = case.setup()
+            start = time.perf_counter()
+            case.run(subject)
+            best = min(best, time.perf_counter() - start)
+        return 1 / best
+
+    subject = case.setup()
+    timer = timeit.Timer(lambda: case.run(subject))
+    # as many calls per repeat as take at least 0.2 seconds
+    number, _ = timer.autorange()
+    return number / min(timer.repeat(repeat, number))
+
+
+def memory_per_node(case: Case) -> float:
+    gc.collect()
+    tracemalloc.start()
+    tree = case.setup()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+
+    return size / case.nodes
+
+
+def run_suite(repeat: int = 5, match: Optional[str] = None) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, float]] = {}
+    for case in cases():
+        if match and match not in case.name:
+            continue
+
+        result = {"ops": time_case(case, repeat)}
+        if case.nodes:
+            result["us_per_node"] = 1e6 / result["ops"] / case.nodes
+            result["bytes_per_node"] = memory_per_node(case)
+        results[case.name] = result
+
+        print(_format_result(case.name, result), flush=True)
+
+    print()
+    print_scaling(results)
+
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def _format_result(name: str, result: Dict[str, float]) -> str:
+    line = f"{name:<36} {result['ops']:>12.1f} ops/s"
+    if "us_per_node" in result:
+        line += (
+            f"  {result['us_per_node']:>7.3f} us/node"
+            f"  {result['bytes_per_node']:>7.1f} bytes/node"
+        )
+    return line
+
+
+def print_scaling(results: Dict[str, Dict[str, float]]) -> None:
+    """Time per item of each series, relative to its smallest size.
+
+    A linear operation stays near 1.0 as the size grows, and one that is
+    cached, like `Css.render()` without variables, falls.
+    """
+    series: Dict[str, List[Tuple[int, float]]] = {}
+    for case in cases():
+        if case.name in results and case.size > 1:
+            series.setdefault(case.series, []).append(
+                (case.size, 1 / results[case.name]["ops"] / case.size)
+            )
+
+    for name, points in series.items():
+        first = points[0][1]
+        curve = "  ".join(
+            f"{size}: x{per_item / first:.2f}" for size, per_item in points
+        )
+        print(f"{name:<36} {curve}")
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Names of the benchmarks that regressed by more than `threshold`."""
+    regressions = []
+    for name, old in baseline["results"].items():
+        new = current["results"].get(name)
+        if new is None:
+            continue
+
+        speed = new["ops"] / old["ops"]
+        memory = (
+            new["bytes_per_node"] / old["bytes_per_node"]
+            if old.get("bytes_per_node")
+            else 1.0
+        )
+        slower = speed < 1 - threshold
+        bigger = memory > 1 + threshold
+        flag = "  REGRESSION" if slower or bigger else ""
+        print(f"{name:<36} speed x{speed:>5.2f}  memory x{memory:>5.2f}{flag}")
+
+        if slower or bigger:
+            regressions.append(name)
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the suite")
+    run.add_argument("--output", help="write the results to this JSON file")
+
+    diff = commands.add_parser("compare", help="compare results with a baseline")
+    diff.add_argument("baseline", help="baseline JSON file")
+    diff.add_argument("current", nargs="?", help="results JSON file, or run the suite")
+    diff.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="fraction of slow-down or growth reported as a regression",
+    )
+
+    for command in (run, diff):
+        command.add_argument("--repeat", type=int, default=3)
+        command.add_argument("--match", help="only run benchmarks containing this")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_suite(args.repeat, args.match)
+        if args.output:
+            with open(args.output, "w") as fp:
+                json.dump(results, fp, indent=2, sort_keys=True)
+        return 0
+
+    with open(args.baseline) as fp:
+        baseline = json.load(fp)
+    if args.current:
+        with open(args.current) as fp:
+            current = json.load(fp)
+    else:
+        current = run_suite(args.repeat, args.match)
+        print()
+
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import codecs
+from itertools import islice
+from typing import Any, Iterable, Iterator
+
+# rendered chunks joined into one string before it is encoded
+_ENCODE_BATCH_CHUNKS = 512
+
+
+def encode_chunks(chunks: Iterable[str], encoding: str = "utf-8") -> Iterator[bytes]:
+    """Encode a stream of rendered chunks a few hundred chunks at a time.
+
+    Encoding batches is as fast as encoding the whole output at once, without
+    ever holding the whole output as a string.
+    """
+    # an incremental encoder writes a byte order mark only once, at the start
+    encode = codecs.getincrementalencoder(encoding)().encode
+    chunks = iter(chunks)
+    while True:
+        batch = list(islice(chunks, _ENCODE_BATCH_CHUNKS))
+        if not batch:
+            break
+        yield encode("".join(batch))
+
+    tail = encode("", True)
+    if tail:
+        yield tail
+
+
+def write_into(buffer: Any, blocks: Iterable[bytes]) -> int:
+    """Write `blocks` into `buffer` and return the number of bytes written.
+
+    A `bytearray` is extended and a `memoryview` is filled from its start;
+    anything else must be a writable binary stream, such as a file or an
+    `mmap`. A `memoryview` that is too small raises `ValueError`.
+    """
+    written = 0
+
+    if isinstance(buffer, bytearray):
+        for block in blocks:
+            buffer += block
+            written += len(block)
+    elif isinstance(buffer, memoryview):
+        view = buffer.cast("B") if buffer.format != "B" else buffer
+        for block in blocks:
+            end = written + len(block)
+            if end > len(view):
+                raise ValueError(
+                    f"buffer of {len(view)} bytes is too small for the output"
+                )
+            view[written:end] = block
+            written = end
+    elif hasattr(buffer, "write"):
+        for block in blocks:
+            buffer.write(block)
+            written += len(block)
+    else:
+        raise TypeError(
+            f"cannot render into {type(buffer).__name__}; expected a bytearray, "
+            "a memoryview or a binary stream"
+        )
+
+    return written
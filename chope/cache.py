@@ -0,0 +1,125 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+
+class FragmentCache:
+    """In-process store for rendered fragments with LRU and TTL eviction.
+
+    At most `maxsize` fragments are kept; the least recently used one is
+    evicted first. Fragments older than their time-to-live (`ttl` seconds,
+    `None` for no expiry) are treated as missing. Values are usually
+    rendered strings, but any value can be stored, such as the components
+    imported by `chope.parser.parse_html()`.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._timer = timer
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > self._timer():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self._ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self._timer() + ttl
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self._maxsize,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+default_store = FragmentCache()
+
+
+class Cached:
+    """A subtree whose rendered output is kept in a fragment store.
+
+    `subtree` is an element, a stylesheet, or a function building one. On a
+    cache hit for `(key, indent)` the stored string is used and the function
+    is not called; output rendered with `minify=True` is stored under its own
+    key. `store` defaults to `chope.cache.default_store` at render
+    time, and `ttl` overrides the store's time-to-live for this fragment.
+    """
+
+    __slots__ = ("_key", "_subtree", "_ttl", "_store")
+
+    def __init__(
+        self,
+        key: Hashable,
+        subtree: Any,
+        ttl: Optional[float] = None,
+        store: Optional[FragmentCache] = None,
+    ) -> None:
+        self._key = key
+        self._subtree = subtree
+        self._ttl = ttl
+        self._store = store
+
+    def render(self, indent: int = 2, minify: bool = False) -> str:
+        store = self._store if self._store is not None else default_store
+        key = (self._key, indent, True) if minify else (self._key, indent)
+
+        rendered = store.get(key)
+        if rendered is None:
+            subtree = (
+                self._subtree
+                if hasattr(self._subtree, "iter_render")
+                else self._subtree()
+            )
+            rendered = (
+                subtree.render(indent, minify=True)
+                if minify
+                else "".join(subtree.iter_render(indent))
+            )
+            store.set(key, rendered, self._ttl)
+
+        return rendered
+
+    def _iter_render(self, indent: int, nl: str, minify: bool = False) -> Iterator[str]:
+        rendered = self.render(indent, minify)
+        yield rendered if nl == "\n" else rendered.replace("\n", nl)
@@ -0,0 +1,209 @@
+import codecs
+from itertools import chain, islice, repeat
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from chope.buffers import write_into
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+class Hole:
+    """A variable slot of a compiled template.
+
+    `fill` renders the slot from the variable values passed to
+    `Template.render()`; `names` are the variables it depends on.
+
+    `rebuild` is a `(function, args)` pair returning an equal hole, used to
+    serialize the hole since `fill` usually is a closure.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        fill: Callable[[Dict[str, Any]], str],
+        rebuild: Optional[Tuple[Callable[..., "Hole"], Tuple[Any, ...]]] = None,
+    ) -> None:
+        self.names: FrozenSet[str] = frozenset(names)
+        self.fill = fill
+        self.rebuild = rebuild
+
+    def __reduce__(self) -> Tuple[Callable[..., "Hole"], Tuple[Any, ...]]:
+        if self.rebuild is None:
+            raise TypeError("this template hole cannot be serialized")
+
+        return self.rebuild
+
+
+class Template:
+    """A pre-rendered element or stylesheet with holes for its variables.
+
+    Everything that does not depend on a `Var` is rendered once, when the
+    template is compiled. Rendering a template only fills in the holes, and
+    gives the same result as `set_vars(values).render(indent)` on the source.
+    """
+
+    def __init__(self, parts: Iterable[Union[str, Hole]], indent: int = 2) -> None:
+        self._indent = indent
+        self._segments: List[Union[str, Hole]] = []
+        # byte order mark and segments with the static ones encoded, per encoding
+        self._encoded: Dict[str, List[Union[bytes, Hole]]] = {}
+
+        static: List[str] = []
+        for part in parts:
+            if isinstance(part, str):
+                static.append(part)
+            else:
+                if static:
+                    self._segments.append("".join(static))
+                    static = []
+                self._segments.append(part)
+
+        if static:
+            self._segments.append("".join(static))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _restore_template, (self._segments, self._indent)
+
+    @property
+    def indent(self) -> int:
+        return self._indent
+
+    @property
+    def segments(self) -> List[Union[str, Hole]]:
+        return list(self._segments)
+
+    def get_vars(self) -> FrozenSet[str]:
+        return frozenset(
+            name
+            for segment in self._segments
+            if isinstance(segment, Hole)
+            for name in segment.names
+        )
+
+    def iter_render(self, values_: Dict[str, Any] = {}, **kwargs) -> Iterator[str]:
+        values = {k: v for k, v in chain(values_.items(), kwargs.items())}
+
+        for segment in self._segments:
+            yield segment if segment.__class__ is str else segment.fill(values)
+
+    def render(self, values_: Dict[str, Any] = {}, **kwargs) -> str:
+        return "".join(self.iter_render(values_, **kwargs))
+
+    def render_bytes(
+        self, values_: Dict[str, Any] = {}, encoding: str = "utf-8", **kwargs
+    ) -> bytes:
+        """Render the template as encoded bytes.
+
+        Static segments are only encoded once per encoding; only the holes are
+        encoded on every render.
+        """
+        return b"".join(self._iter_encoded(values_, encoding, kwargs))
+
+    def render_into(
+        self,
+        buffer: Any,
+        values_: Dict[str, Any] = {},
+        encoding: str = "utf-8",
+        **kwargs,
+    ) -> int:
+        """Render the template into `buffer`, as `Element.render_into()` does."""
+        return write_into(buffer, self._iter_encoded(values_, encoding, kwargs))
+
+    def _iter_encoded(
+        self, values_: Dict[str, Any], encoding: str, kwargs: Dict[str, Any]
+    ) -> Iterator[bytes]:
+        # every segment is encoded on its own, after any byte order mark
+        encoded = self._encoded.get(encoding)
+        if encoded is None:
+            encode = codecs.getincrementalencoder(encoding)().encode
+            encoded = self._encoded[encoding] = [encode("")] + [
+                encode(segment, True) if segment.__class__ is str else segment
+                for segment in self._segments
+            ]
+
+        values = {k: v for k, v in chain(values_.items(), kwargs.items())}
+        encode = codecs.getincrementalencoder(encoding)().encode
+        encode("")
+        for segment in encoded:
+            if segment.__class__ is bytes:
+                yield segment
+            else:
+                yield encode(segment.fill(values), True)
+
+    def render_many(self, values: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        """Render the template once for every dict of variable values."""
+        segments = self._segments
+
+        if all(segment.__class__ is str for segment in segments):
+            static = "".join(segments)
+            for _ in values:
+                yield static
+        else:
+            for value in values:
+                yield "".join(
+                    [
+                        segment if segment.__class__ is str else segment.fill(value)
+                        for segment in segments
+                    ]
+                )
+
+
+def _restore_template(segments: List[Union[str, Hole]], indent: int) -> Template:
+    template = Template.__new__(Template)
+    template._segments = segments
+    template._indent = indent
+    template._encoded = {}
+    return template
+
+
+def render_many(
+    source: Any,
+    values: Iterable[Dict[str, Any]],
+    indent: int = 2,
+    generator: bool = False,
+    executor: Optional["Executor"] = None,
+    chunksize: int = 100,
+) -> Union[List[str], Iterator[str]]:
+    """Render an element or stylesheet once for every dict of variable values.
+
+    The source is compiled once, in the calling process. With an `executor`,
+    the compiled template is sent to the workers along with the values, in
+    batches of `chunksize`. Outputs are returned in the order of `values`, as
+    a list or, with `generator=True`, as an iterator.
+    """
+    template = source.compile(indent)
+
+    if executor is None:
+        outputs = template.render_many(values)
+    else:
+        batches = executor.map(
+            _render_batch, repeat(template), _batches(values, chunksize)
+        )
+        outputs = chain.from_iterable(batches)
+
+    return outputs if generator else list(outputs)
+
+
+def _render_batch(template: Template, batch: List[Dict[str, Any]]) -> List[str]:
+    return list(template.render_many(batch))
+
+
+def _batches(values: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    values = iter(values)
+    batch = list(islice(values, size))
+    while batch:
+        yield batch
+        batch = list(islice(values, size))
@@ -1,31 +1,107 @@
-from functools import reduce
+import re
 from itertools import chain
-from typing import Any, Dict, Iterable, List, Set, Union
-
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from chope.buffers import encode_chunks, write_into
+from chope.hashing import structural_hash
+from chope.compiled import Hole, Template, render_many
 from chope.variable import Var
 
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
 
 class RenderError(Exception):
     pass
 
 
 class Rule:
+    __slots__ = (
+        "__declarations",
+        "__name",
+        "__var_index",
+        "__vars",
+        "__hash",
+        "__rendered",
+    )
+
     def __init__(self, name: str, declarations: List[dict]):
-        self.__declarations = declarations
+        self.__declarations = _normalize_properties(declarations)
         self.__name = name
+        self.__var_index: Optional[Dict[str, Tuple[str, ...]]] = None
+        self.__vars: Optional[FrozenSet[str]] = None
+        self.__hash: Optional[int] = None
+        self.__rendered: Dict[int, str] = {}
 
     def __eq__(self, __value: object) -> bool:
-        return (
+        return self is __value or (
             isinstance(__value, Rule)
             and self.__declarations == __value.__declarations
             and self.__name == __value.__name
         )
 
+    def __hash__(self) -> int:
+        if self.__hash is None:
+            self.__hash = hash(
+                (Rule, self.__name, structural_hash(self.__declarations))
+            )
+
+        return self.__hash
+
+    def __reduce__(self) -> tuple:
+        return _restore_rule, (self.__name, self.__declarations)
+
+    @classmethod
+    def _restore(cls, name: str, declarations: Any) -> "Rule":
+        # the declarations are already normalized
+        rule = cls.__new__(cls)
+        rule.__name = name
+        rule.__declarations = declarations
+        rule.__var_index = None
+        rule.__vars = None
+        rule.__hash = None
+        rule.__rendered = {}
+        return rule
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
     def render(self, indent: int = 2) -> str:
+        """Render the rule. Rules without variables are rendered once per indent."""
+        rendered = self.__rendered.get(indent)
+        if rendered is None:
+            rendered = self.__render(indent)
+            if not self.get_vars():
+                self.__rendered[indent] = rendered
+
+        return rendered
+
+    def __render(self, indent: int) -> str:
         nl = "\n"
         indented = indent > 0
-        declarations_str = ""
+        declarations_str = "".join(
+            f'{" " * indent}{property}: {value};{nl * indented}'
+            for property, value in self._iter_declarations()
+        )
+
+        return f"{self.__name} {{{nl * indented}{declarations_str}}}"
 
+    def _iter_declarations(self) -> Iterator[Tuple[str, Any]]:
+        # Yields every property with its value resolved, ready to be written.
         def get_value(var: Any) -> Any:
             if isinstance(var, Dict):
                 return var
@@ -41,73 +117,109 @@ class Rule:
                 f"Invalid declaration {declarations} in rule '{self.__name}'. Declarations must be a dict object."
             )
 
-        for property, value in declarations.items():
+        # declarations set through a `Var` have not been normalized yet
+        for property, value in _normalize_properties(declarations).items():
             value = get_value(value)
             if isinstance(value, Iterable) and not isinstance(value, str):
-                value = " ".join(value)
+                value = " ".join(str(get_value(item)) for item in value)
 
-            declarations_str += (
-                f'{" " * indent}{property.replace("_", "-")}: {value};{nl * indented}'
-            )
+            yield property, value
 
-        return f"{self.__name} {{{nl * indented}{declarations_str}}}"
+    def _minify(self) -> Tuple[str, Dict[str, str]]:
+        return (
+            _minify_selector(self.__name),
+            {prop: str(value).strip() for prop, value in self._iter_declarations()},
+        )
 
-    def get_vars(self) -> Set[str]:
-        def get_var(var: Var) -> Set[str]:
-            if isinstance(var.value, Var):
-                return {var.name}.union(get_var(var.value))
+    def get_vars(self) -> FrozenSet[str]:
+        if self.__vars is None:
+            declarations = self.__declarations
+            if isinstance(declarations, Var):
+                names = set()
+                while isinstance(declarations, Var):
+                    names.add(declarations.name)
+                    declarations = declarations.value
+            elif isinstance(declarations, dict):
+                names = self.__get_var_index().keys()
             else:
-                return {var.name}
-
-        if isinstance(self.__declarations, Var):
-            return get_var(self.__declarations)
-        elif isinstance(self.__declarations, dict):
-            return reduce(
-                lambda out, s: out.union(s),
-                (get_var(d) for d in self.__declarations.values()),
-                set(),
-            )
-        else:
-            return set()
+                names = ()
+
+            self.__vars = frozenset(names)
+
+        return self.__vars
 
     def set_vars(self, values: Dict[str, Any]) -> "Rule":
-        def set_var(comp: Any, values: Dict[str, Any]) -> Any:
-            if isinstance(comp, Var):
-                new_var = comp.set_value(values)
-                if new_var == comp and isinstance(new_var.value, Var):
-                    return Var(new_var.name, new_var.value.set_vars(values))
-                else:
-                    return new_var
-            else:
-                return comp
-
-        if isinstance(self.__declarations, dict):
-            new_declarations = {
-                attr: set_var(value, values)
-                for attr, value in self.__declarations.items()
-            }
-        elif isinstance(self.__declarations, Var):
-            old_var = self.__declarations
-            new_var = set_var(old_var, values)
-            new_declarations = (
-                self if new_var == old_var else Var(old_var.name, new_var.value)
-            )
+        declarations = self.__declarations
+
+        if isinstance(declarations, dict):
+            # only the declarations that hold one of the variables are updated
+            index = self.__get_var_index()
+            updates = {}
+            for prop in {p for name in values if name in index for p in index[name]}:
+                old_var = declarations[prop]
+                new_var = old_var.set_value(values)
+                if new_var is not old_var:
+                    updates[prop] = new_var
+
+            new_declarations = {**declarations, **updates} if updates else declarations
+        elif isinstance(declarations, Var):
+            new_declarations = declarations.set_value(values)
         else:
-            new_declarations = self.__declarations
+            new_declarations = declarations
 
         return (
             self
-            if new_declarations == self.__declarations
+            if new_declarations is declarations
             else Rule(self.__name, new_declarations)
         )
 
+    def __get_var_index(self) -> Dict[str, Tuple[str, ...]]:
+        if self.__var_index is None:
+            index: Dict[str, list] = {}
+            for prop, value in self.__declarations.items():
+                while isinstance(value, Var):
+                    index.setdefault(value.name, []).append(prop)
+                    value = value.value
+
+            self.__var_index = {name: tuple(props) for name, props in index.items()}
+
+        return self.__var_index
+
 
 class Css:
+    __slots__ = (
+        "_rules",
+        "_var_index",
+        "_vars",
+        "_hash",
+        "_rendered",
+        "_minified",
+        "_lengths",
+    )
+
     def __init__(self, rules: List[Rule]):
         self._rules = rules
+        self._var_index: Optional[Dict[str, Tuple[int, ...]]] = None
+        self._vars: Optional[FrozenSet[str]] = None
+        self._hash: Optional[int] = None
+        self._rendered: Dict[Tuple[int, str], List[Union[str, Rule]]] = {}
+        self._minified: Optional[str] = None
+        self._lengths: Dict[Tuple[int, bool], int] = {}
 
     def __eq__(self, __value: object) -> bool:
-        return isinstance(__value, Css) and self._rules == __value._rules
+        return self is __value or (
+            isinstance(__value, Css)
+            and self._rules == __value._rules
+        )
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash((Css, tuple(hash(rule) for rule in self._rules)))
+
+        return self._hash
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (self._rules,)
 
     def __class_getitem__(cls, items: Union[slice, Iterable[slice]]) -> "Css":
         if isinstance(items, slice):
@@ -117,32 +229,363 @@ class Css:
 
         return cls(rules)
 
-    def render(self, indent: int = 2) -> str:
-        indented = indent > 0
-        return ("\n\n" * indented).join((rule.render(indent) for rule in self._rules))
+    def render(self, indent: int = 2, minify: bool = False) -> str:
+        """Render the stylesheet.
 
-    def get_vars(self) -> Set[str]:
-        return reduce(
-            lambda out, s: out.union(s),
-            (rule.get_vars() for rule in self._rules),
-            set(),
-        )
+        Runs of rules without variables are rendered once per indent; only the
+        rules holding variables are rendered again.
+
+        With `minify=True` the output has no optional whitespace or trailing
+        semicolons, rules with the same selector are merged, overridden
+        properties are dropped and selectors with identical declarations are
+        grouped. Rules are only moved when that cannot change the cascade.
+        """
+        if not minify:
+            return "".join(self._iter_render(indent, "\n"))
+
+        minified = self._minified
+        if minified is None:
+            minified = _minify_rules([rule._minify() for rule in self._rules])
+            if not self.get_vars():
+                self._minified = minified
+
+        return minified
+
+    def render_length(self, indent: int = 2, minify: bool = False) -> int:
+        """Length in bytes of the UTF-8 encoded `render()` output.
+
+        Stylesheets without variables are only measured once per indent.
+        """
+        key = (indent, minify)
+        length = self._lengths.get(key)
+        if length is not None:
+            return length
+
+        if minify:
+            length = _utf8_length(self.render(minify=True))
+        else:
+            length = sum(map(_utf8_length, self._iter_render(indent, "\n")))
+
+        if not self.get_vars():
+            self._lengths[key] = length
+
+        return length
+
+    def iter_render(self, indent: int = 2) -> Iterator[str]:
+        """Render the stylesheet as a stream of string chunks.
+
+        Joining the chunks gives exactly the same string as `render()`.
+        """
+        return self._iter_render(indent, "\n")
+
+    def render_to(self, fp: TextIO, indent: int = 2) -> None:
+        """Render the stylesheet into a writable text stream rule by rule."""
+        for chunk in self.iter_render(indent):
+            fp.write(chunk)
+
+    def render_bytes(
+        self, indent: int = 2, minify: bool = False, encoding: str = "utf-8"
+    ) -> bytes:
+        """Render the stylesheet as encoded bytes."""
+        return b"".join(encode_chunks(self._chunks(indent, minify), encoding))
+
+    def render_into(
+        self,
+        buffer: Any,
+        indent: int = 2,
+        minify: bool = False,
+        encoding: str = "utf-8",
+    ) -> int:
+        """Render the stylesheet into `buffer`, as `Element.render_into()` does."""
+        return write_into(buffer, encode_chunks(self._chunks(indent, minify), encoding))
+
+    def _chunks(self, indent: int, minify: bool) -> Iterable[str]:
+        if minify:
+            return (self.render(minify=True),)
+
+        return self._iter_render(indent, "\n")
+
+    def _iter_render(self, indent: int, nl: str) -> Iterator[str]:
+        key = (indent, nl)
+        parts = self._rendered.get(key)
+        if parts is None:
+            parts = self._rendered[key] = self._prerender(indent, nl)
+
+        for part in parts:
+            if part.__class__ is str:
+                yield part
+            else:
+                text = part.render(indent)
+                yield text.replace("\n", nl) if nl != "\n" else text
+
+    def _prerender(self, indent: int, nl: str) -> List[Union[str, Rule]]:
+        # Consecutive rules without variables are joined into one string; rules
+        # with variables are kept to be rendered on every call.
+        sep = nl + nl if indent > 0 else ""
+        parts: List[Union[str, Rule]] = []
+        static: List[str] = []
+
+        for i, rule in enumerate(self._rules):
+            if i:
+                static.append(sep)
+
+            if rule.get_vars():
+                if static:
+                    parts.append("".join(static))
+                    static = []
+                parts.append(rule)
+            else:
+                static.append(rule.render(indent).replace("\n", nl))
+
+        if static:
+            parts.append("".join(static))
+
+        return parts
+
+    def compile(self, indent: int = 2) -> Template:
+        """Pre-render every rule that does not depend on a `Var`.
+
+        `compile(indent).render(values)` gives the same string as
+        `set_vars(values).render(indent)`, but only re-renders the variables.
+        """
+        return Template(self._iter_compile(indent, "\n"), indent)
+
+    def render_many(
+        self,
+        values: Iterable[Dict[str, Any]],
+        indent: int = 2,
+        generator: bool = False,
+        executor: Optional["Executor"] = None,
+        chunksize: int = 100,
+    ) -> Union[List[str], Iterator[str]]:
+        """Render the stylesheet once for every dict of variable values.
+
+        See `Element.render_many`.
+        """
+        return render_many(self, values, indent, generator, executor, chunksize)
+
+    def _iter_compile(self, indent: int, nl: str) -> Iterator[Union[str, Hole]]:
+        sep = nl + nl if indent > 0 else ""
+
+        for i, rule in enumerate(self._rules):
+            if i:
+                yield sep
+
+            if rule.get_vars():
+                yield _rule_hole(rule, indent, nl)
+            else:
+                yield rule.render(indent).replace("\n", nl)
+
+    def get_vars(self) -> FrozenSet[str]:
+        if self._vars is None:
+            self._vars = frozenset(self._get_var_index())
+
+        return self._vars
 
     def set_vars(self, values_: Dict[str, Any], **kwargs) -> "Css":
         combined_values = {k: v for k, v in chain(values_.items(), kwargs.items())}
 
+        index = self._get_var_index()
+        positions = {
+            i for name in combined_values if name in index for i in index[name]
+        }
+
         # shoutout to Dua Lipa
-        new_rules = [rule.set_vars(combined_values) for rule in self._rules]
-        return self if new_rules == self._rules else Css(new_rules)
+        new_rules = list(self._rules)
+        for i in positions:
+            new_rules[i] = self._rules[i].set_vars(combined_values)
+
+        if all(new_rules[i] is self._rules[i] for i in positions):
+            return self
+        else:
+            return Css(new_rules)
+
+    def _get_var_index(self) -> Dict[str, Tuple[int, ...]]:
+        # Maps every variable name to the positions of the rules using it.
+        if self._var_index is None:
+            index: Dict[str, list] = {}
+            for i, rule in enumerate(self._rules):
+                for name in rule.get_vars():
+                    index.setdefault(name, []).append(i)
+
+            self._var_index = {name: tuple(rules) for name, rules in index.items()}
+
+        return self._var_index
+
+
+def _utf8_length(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode())
+
+
+def _restore_rule(name: str, declarations: Any) -> Rule:
+    return Rule._restore(name, declarations)
+
+
+def _rule_hole(rule: Rule, indent: int, nl: str) -> Hole:
+    return Hole(
+        rule.get_vars(),
+        lambda values: rule.set_vars(values).render(indent).replace("\n", nl),
+        (_rule_hole, (rule, indent, nl)),
+    )
+
+
+def _normalize_properties(declarations: Any) -> Any:
+    # `font_size` is written as `font-size` in CSS
+    if isinstance(declarations, dict) and any(
+        isinstance(prop, str) and "_" in prop for prop in declarations
+    ):
+        return {
+            prop.replace("_", "-") if isinstance(prop, str) else prop: value
+            for prop, value in declarations.items()
+        }
+
+    return declarations
+
+
+_QUOTED_PATTERN = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+
+# longhands that a shorthand with another prefix also sets, e.g. `gap` sets
+# `row-gap`, mapped to the group of that shorthand
+_SHORTHAND_GROUPS = {
+    "row-gap": "gap",
+    "column-gap": "gap",
+    "grid-gap": "gap",
+    "grid-row-gap": "gap",
+    "grid-column-gap": "gap",
+    "top": "inset",
+    "right": "inset",
+    "bottom": "inset",
+    "left": "inset",
+    "align-content": "place",
+    "align-items": "place",
+    "align-self": "place",
+    "justify-content": "place",
+    "justify-items": "place",
+    "justify-self": "place",
+    "line-height": "font",
+    "column-count": "columns",
+    "column-width": "columns",
+    "text-wrap": "white",
+    "text-wrap-mode": "white",
+}
+
+_VENDOR_PATTERN = re.compile(r"^-(?:webkit|moz|ms|o)-")
+
+
+def _minify_selector(selector: str) -> str:
+    # quoted attribute values are kept as they are
+    parts = _QUOTED_PATTERN.split(selector.strip())
+    for i in range(0, len(parts), 2):
+        part = re.sub(r"\s+", " ", parts[i])
+        parts[i] = re.sub(r" ?([,>+~]) ?", r"\1", part)
+
+    return "".join(parts)
+
+
+def _property_groups(prop: str) -> Tuple[str, ...]:
+    # `margin` and `margin-top` set the same thing, so they must keep their
+    # order, as must `gap` and `row-gap`. Vendor-prefixed properties go with
+    # the standard ones, custom properties stand alone and `all` sets
+    # everything.
+    if prop.startswith("--"):
+        return (prop,)
+    if prop == "all":
+        return ("*",)
+
+    prop = _VENDOR_PATTERN.sub("", prop)
+    group = prop.split("-", 1)[0]
+    shorthand = _SHORTHAND_GROUPS.get(prop)
+
+    return (group, shorthand) if shorthand else (group,)
+
+
+def _is_blocked(groups: Set[str], last: Dict[str, int], i: int) -> bool:
+    # whether a block setting `groups` is set after position `i`
+    if "*" in groups:
+        return any(j > i for j in last.values())
+
+    return any(last.get(group, -1) > i for group in chain(groups, ("*",)))
+
+
+def _can_move(selector: str) -> bool:
+    # at-rules such as @font-face must stay separate, and a selector list
+    # with one unsupported vendor selector is dropped entirely by browsers
+    return not selector.startswith("@") and ":-" not in selector
+
+
+def _minify_rules(rules: List[Tuple[str, Dict[str, str]]]) -> str:
+    # A rule can only be moved up to an earlier one when no rule in between
+    # sets a property of the same group, so `last` keeps the position of the
+    # last block setting each group.
+
+    # merge rules with the same selector, the later declarations winning
+    blocks: List[Tuple[List[str], Dict[str, str]]] = []
+    by_selector: Dict[str, int] = {}
+    last: Dict[str, int] = {}
+
+    for selector, declarations in rules:
+        groups = {group for prop in declarations for group in _property_groups(prop)}
+        i = by_selector.get(selector)
+        if i is None or _is_blocked(groups, last, i):
+            i = len(blocks)
+            blocks.append(([selector], {}))
+            if _can_move(selector):
+                by_selector[selector] = i
+
+        block = blocks[i][1]
+        for prop, value in declarations.items():
+            if prop in block:
+                if block[prop].endswith("!important") and not value.endswith(
+                    "!important"
+                ):
+                    continue
+                del block[prop]
+            block[prop] = value
+
+        for group in groups:
+            last[group] = i
+
+    # group selectors with identical declarations
+    grouped: List[Tuple[List[str], Dict[str, str]]] = []
+    by_block: Dict[Tuple[Tuple[str, str], ...], int] = {}
+    last = {}
+
+    for selectors, block in blocks:
+        if not block:
+            continue
+
+        key = tuple(block.items())
+        groups = {group for prop in block for group in _property_groups(prop)}
+        i = by_block.get(key)
+        if i is None or not _can_move(selectors[0]) or _is_blocked(groups, last, i):
+            i = len(grouped)
+            grouped.append((list(selectors), block))
+            if _can_move(selectors[0]):
+                by_block[key] = i
+        elif selectors[0] not in grouped[i][0]:
+            grouped[i][0].extend(selectors)
+
+        for group in groups:
+            last[group] = i
+
+    return "".join(
+        f"{','.join(selectors)}{{{';'.join(f'{p}:{v}' for p, v in block.items())}}}"
+        for selectors, block in grouped
+    )
 
 
 class Unit:
+    __slots__ = ("__name",)
+
     def __init__(self, name: str):
         self.__name = name
 
     def __truediv__(self, value) -> str:
         return str(value) + self.__name
 
+    def __reduce__(self) -> tuple:
+        return Unit, (self.__name,)
+
 
 cm = Unit("cm")
 ch = Unit("ch")
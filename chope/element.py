@@ -1,34 +1,134 @@
 import re
-from functools import reduce
+from contextvars import ContextVar
+from functools import lru_cache
 from itertools import chain
-from typing import Any, Dict, Iterable, Set, Tuple, Union
+from types import MappingProxyType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+    Type,
+    Union,
+)
 
+from chope.buffers import encode_chunks, write_into
+from chope.cache import Cached
 from chope.css import Css
+from chope.hashing import structural_hash
+from chope.selector import Compound, TreeIndex
+from chope.compiled import Hole, Template, render_many
 from chope.variable import Var
 
+if TYPE_CHECKING:
+    # slow to import, and only needed by `render_async()` and `render_parallel()`
+    import asyncio
+    from concurrent.futures import Executor
+
 
 class DuplicateAttributeError(Exception):
     pass
 
 
+# id.class1.class2
+_SELECTOR_PATTERN = re.compile(r"^(?:#([^\s\.#]+))?(?:\.([^\s#]+))?")
+
+# chunks collected by the async renderer before they are passed on
+_ASYNC_FLUSH_CHUNKS = 512
+
+# sibling lists shorter than this are rendered serially by `render_parallel()`
+_PARALLEL_THRESHOLD = 1000
+
+# shared by all elements without attributes
+_NO_ATTRIBUTES: Mapping[str, Any] = MappingProxyType({})
+
+# the `chope.profiling.RenderProfile`s collecting statistics in this context
+_render_profiles: ContextVar[Tuple[Any, ...]] = ContextVar(
+    "chope_render_profiles", default=()
+)
+
+# The caches that depend on descendants (variables, the query index and kept
+# lengths) are only valid in the epoch they were filled in. Elements have no
+# link to their parents, so changing an element in place after a cache has
+# seen it starts a new epoch, as it may be part of the caches of ancestors.
+_tree_epoch = 0
+
+
 class Element:
+    __slots__ = (
+        "_components",
+        "_classes",
+        "_id",
+        "_attributes",
+        "_var_index",
+        "_vars",
+        "_hash",
+        "_index",
+        "_lengths",
+        "_epoch",
+    )
+
+    # tag strings, built once per class by `__init_subclass__`
+    _tag_name = "Element"
+    _tag_open = "<Element"
+    _tag_close = "</Element>"
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._tag_name = cls.__name__
+        cls._tag_open = f"<{cls.__name__}"
+        cls._tag_close = f"</{cls.__name__}>"
+
     def __init__(self, *args, **kwargs):
         self._components: Tuple[Component, ...] = ()
+        self._var_index: Optional[Dict[str, Tuple[Tuple[str, Any], ...]]] = None
+        self._vars: Optional[FrozenSet[str]] = None
+        self._hash: Optional[int] = None
+        self._index: Optional[TreeIndex] = None
+        self._lengths: Optional[Dict[Tuple[int, bool], Tuple[int, int]]] = None
+        # the epoch of the caches, None until a cache has seen the element
+        self._epoch: Optional[int] = None
+
+        if args or kwargs:
+            self._id, self._classes, self._attributes = self._parse_attributes(
+                args, kwargs
+            )
+        else:
+            self._id = ""
+            self._classes = ""
+            self._attributes: Mapping[str, Any] = _NO_ATTRIBUTES
 
-        self._classes = ""
-        self._id = ""
-        self._attributes = {}
+    @staticmethod
+    def _parse_attributes(
+        args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> Tuple[Any, Any, Mapping[str, Any]]:
+        id = ""
+        classes = ""
+        attributes = {}
 
         if args:
             selector_id, selector_classes = (
-                self.__get_id_classes_from_selector(args[0])
-                if len(args) % 2
-                else ("", "")
+                _parse_selector(args[0]) if len(args) % 2 else ("", "")
             )
-            self._classes = selector_classes
+            classes = selector_classes
+
+            tuple_ = args[len(args) % 2 :]
+            for i in range(0, len(tuple_), 2):
+                attributes[tuple_[i]] = tuple_[i + 1]
 
-            tuple_id, tuple_classes, tuple_attrs = (
-                self.__get_id_classes_attrs_from_tuple(args[len(args) % 2 :])
+            tuple_id = attributes.pop("id", "")
+            tuple_classes = (
+                f'{attributes.pop("class")}'.strip() if "class" in attributes else ""
             )
 
             if selector_id and tuple_id:
@@ -36,61 +136,67 @@ class Element:
                     f"id declared twice: id={selector_id} and id={tuple_id}"
                 )
 
-            self._id = selector_id or tuple_id
-            self._classes = (
-                f"{self._classes} {tuple_classes}".strip()
-                if tuple_classes
-                else self._classes
-            )
-
-            self._attributes.update(tuple_attrs)
-
-        if self._id and "id" in kwargs:
-            raise DuplicateAttributeError(
-                f'id declared twice: id={self._id} and id={kwargs["id"]}'
-            )
-
-        self._classes = (
-            f'{self._classes} {kwargs.pop("class_")}'.strip()
-            if "class_" in kwargs
-            else self._classes
-        )
-        self._id = kwargs.pop("id", self._id)
-        self._attributes.update(
-            {key.replace("_", "-"): value for key, value in kwargs.items()}
-        )
-
-    @staticmethod
-    def __get_id_classes_from_selector(selector: str) -> Tuple[str, str]:
-        selector_pattern = r"^(?:#([^\s\.#]+))?(?:\.([^\s#]+))?"  # id.class1.class2
-
-        results = re.findall(selector_pattern, selector)[0]
-        if results:
-            id, classes = results
-            return id, f'{classes.replace(".", " ")}'.strip()
-        else:
-            return "", ""
-
-    @staticmethod
-    def __get_id_classes_attrs_from_tuple(
-        tuple_: Tuple[str, ...],
-    ) -> Tuple[str, str, dict]:
-        attrs = {tuple_[i - 1]: tuple_[i] for i in range(1, len(tuple_), 2)}
+            id = selector_id or tuple_id
+            classes = f"{classes} {tuple_classes}".strip() if tuple_classes else classes
 
-        id = attrs.pop("id", "")
-        classes = f'{attrs.pop("class")}'.strip() if "class" in attrs else ""
+        for key, value in kwargs.items():
+            if key == "id":
+                if id:
+                    raise DuplicateAttributeError(
+                        f"id declared twice: id={id} and id={value}"
+                    )
+                id = value
+            elif key == "class_":
+                classes = f"{classes} {value}".strip()
+            else:
+                attributes[key.replace("_", "-")] = value
 
-        return id, classes, attrs
+        return id, classes, attributes or _NO_ATTRIBUTES
 
     def __eq__(self, __value: object) -> bool:
-        return (
+        return self is __value or (
             isinstance(__value, Element)
+            and self.__class__ is __value.__class__
             and self._components == __value._components
             and self._attributes == __value._attributes
             and self._classes == __value._classes
             and self._id == __value._id
         )
 
+    def __hash__(self) -> int:
+        """Structural hash of the element, cached until its components change.
+
+        Like any mutable dict key, an element keeps its hash when a nested
+        child is changed in place; equality always compares the content.
+        """
+        if self._hash is None:
+            self._hash = hash(
+                (
+                    self.__class__,
+                    structural_hash(self._components),
+                    structural_hash(self._attributes),
+                    structural_hash(self._classes),
+                    structural_hash(self._id),
+                )
+            )
+
+        return self._hash
+
+    def __reduce__(self) -> tuple:
+        # cached indexes and hashes are rebuilt on the other side; string
+        # hashes differ between processes
+        return (
+            _restore_element,
+            (
+                self.__class__,
+                self._components,
+                self._classes,
+                self._id,
+                dict(self._attributes) if self._attributes else None,
+            ),
+            getattr(self, "__dict__", None) or None,
+        )
+
     def __class_getitem__(
         cls, comps: Union["Component", Iterable["Component"], Tuple[Any, ...]]
     ) -> "Element":
@@ -99,146 +205,416 @@ class Element:
     def __getitem__(
         self, comps: Union["Component", Iterable["Component"], Tuple[Any, ...]]
     ) -> "Element":
-        if isinstance(comps, Component.__args__):
+        if isinstance(comps, Component.__args__) or hasattr(comps, "__await__"):
+            # awaitables such as futures can also be iterable
             self._components = (comps,)
+        elif hasattr(comps, "__aiter__"):
+            self._components = (Lazy(comps),)
         else:
+            components = []
+            for comp in comps:
+                if isinstance(comp, str):
+                    components.append(comp)
+                elif not isinstance(comp, Iterable):
+                    components.append(
+                        Lazy(comp) if hasattr(comp, "__aiter__") else comp
+                    )
+                elif hasattr(comp, "__await__"):
+                    components.append(comp)
+                else:
+                    components.extend(comp)
 
-            def as_tuple(x):
-                return (
-                    (x,)
-                    if isinstance(x, str) or not isinstance(x, Iterable)
-                    else tuple(x)
-                )
+            self._components = tuple(components)
 
-            comps_tuples = (as_tuple(comp) for comp in comps)
-            self._components = reduce(lambda l1, l2: l1 + l2, comps_tuples, ())
+        self._var_index = None
+        self._vars = None
+        self._hash = None
+        self._index = None
+        self._lengths = None
+        if self._epoch is not None:
+            global _tree_epoch
+            _tree_epoch += 1
 
         return self
     
     def __call__(self, *args, **kwargs) -> 'Element':
-        ret = self.__class__()
-        updated_element = self.__class__(*args, **kwargs)
+        id, classes, attributes = self._parse_attributes(args, kwargs)
+
+        ret = self._copy()
+        ret._id = id if id else self._id
+        ret._classes = classes if classes else self._classes
+        ret._attributes = {**self._attributes, **attributes} or _NO_ATTRIBUTES
+
+        return ret
+
+    def _copy(self) -> "Element":
+        cls = self.__class__
+        ret = cls.__new__(cls)
         ret._components = self._components
-        ret._id = updated_element._id if updated_element._id else self._id
-        ret._classes = updated_element._classes if updated_element._classes else self._classes
-        ret._attributes = dict(**self._attributes)
-        ret._attributes.update(updated_element._attributes)
+        ret._classes = self._classes
+        ret._id = self._id
+        ret._attributes = self._attributes
+        ret._var_index = None
+        ret._vars = None
+        ret._hash = None
+        ret._index = None
+        ret._lengths = None
+        ret._epoch = None
+
+        state = getattr(self, "__dict__", None)
+        if state:
+            ret.__dict__.update(state)
 
         return ret
 
-    def render(self, indent: int = 2) -> str:
-        nl = "\n"
-        indented = indent > 0
+    def render(self, indent: int = 2, minify: bool = False) -> str:
+        """Render the element. With `minify=True`, stylesheets are minified."""
+        return "".join(self.iter_render(indent, minify))
 
-        def render_var(value, quote_str=False) -> str:
-            if isinstance(value, (Element, Css)):
-                return value.render(indent=indent).replace(nl, f'{nl}{" " * indent}')
-            elif isinstance(value, Var):
-                return render_var(value.value, quote_str=quote_str)
-            elif isinstance(value, str):
-                return (
-                    f"'{value}'"
-                    if '"' in value
-                    else f'"{value}"'
-                    if quote_str
-                    else value
-                )
-            elif isinstance(value, Iterable):
-                return f'{nl * indented}{" " * indent}'.join((render_var(i) for i in value))
-            else:
-                return str(value)
+    def iter_render(self, indent: int = 2, minify: bool = False) -> Iterator[str]:
+        """Render the element as a stream of string chunks in document order.
 
-        comp_str = nl * indented
-        for comp in self._components:
-            if isinstance(comp, str):
-                _comp = comp.replace("\n", "<br>")
-                comp_str += f'{" " * indent}{_comp}{nl * indented}'
-            elif isinstance(comp, Var):
-                comp_str += f'{" " * indent}{render_var(comp)}{nl * indented}'
+        Joining the chunks gives exactly the same string as `render()`, but the
+        whole document is never held in memory at once.
+        """
+        expand = _expand_minified if minify else _expand
+
+        profiles = _render_profiles.get()
+        if profiles:
+            from chope.profiling import _drive_profiled
+
+            return _drive_profiled(self, indent, expand, profiles)
+
+        return _drive(expand(self, indent, "\n"), indent, expand)
+
+    def render_length(self, indent: int = 2, minify: bool = False) -> int:
+        """Length in bytes of the UTF-8 encoded `render()` output, without building it.
+
+        Lengths of subtrees without variables, lazy or cached components are
+        kept, so measuring again only walks the parts that can change. Changing
+        a measured element in place with `[...]` discards all kept lengths.
+        """
+        return _measure(self, indent, minify)
+
+    def render_to(self, fp: TextIO, indent: int = 2, minify: bool = False) -> None:
+        """Render the element into a writable text stream chunk by chunk."""
+        for chunk in self.iter_render(indent, minify):
+            fp.write(chunk)
+
+    def render_bytes(
+        self, indent: int = 2, minify: bool = False, encoding: str = "utf-8"
+    ) -> bytes:
+        """Render the element as encoded bytes, without building a string first."""
+        return b"".join(encode_chunks(self.iter_render(indent, minify), encoding))
+
+    def render_into(
+        self,
+        buffer: Any,
+        indent: int = 2,
+        minify: bool = False,
+        encoding: str = "utf-8",
+    ) -> int:
+        """Render the element as encoded bytes into `buffer`.
+
+        `buffer` is a `bytearray`, a writable `memoryview`, e.g. of an `mmap`,
+        or a writable binary stream. Returns the number of bytes written.
+        """
+        return write_into(
+            buffer, encode_chunks(self.iter_render(indent, minify), encoding)
+        )
+
+    async def render_async(self, indent: int = 2) -> str:
+        """Render the element, awaiting asynchronous values on the way.
+
+        `Var` values may be awaitables and components may be asynchronous
+        iterables. All awaitables are started concurrently before rendering
+        begins.
+        """
+        return "".join([chunk async for chunk in self.aiter_render(indent)])
+
+    def aiter_render(self, indent: int = 2) -> AsyncIterator[str]:
+        """Asynchronous version of `iter_render()`.
+
+        Output is produced in document order. Whatever is ready is passed on
+        before waiting for the next pending value.
+        """
+        return _adrive(self, indent)
+
+    def render_parallel(
+        self,
+        executor: "Executor",
+        indent: int = 2,
+        threshold: int = _PARALLEL_THRESHOLD,
+        chunksize: Optional[int] = None,
+    ) -> str:
+        """Render large sibling lists on an executor, e.g. a `ProcessPoolExecutor`.
+
+        Elements with at least `threshold` components have them split into
+        chunks of `chunksize` siblings that are rendered by the executor and
+        joined back in order. Smaller trees are rendered serially. Components
+        sent to a process pool must be picklable; `Lazy` and `Cached`
+        components are always rendered in the calling process.
+        """
+        if chunksize is None:
+            chunksize = max(threshold // 4, 1)
+
+        def expand(comp: Any, indent: int, nl: str) -> Iterator[Union[str, tuple]]:
+            if (
+                isinstance(comp, Element)
+                and type(comp).render is Element.render
+                and len(comp._components) >= threshold
+            ):
+                return _iter_parallel(comp, executor, chunksize, indent, nl)
             else:
-                _comp_str = comp.render(indent).replace(
-                    nl, f'{nl * indented}{" " * indent}'
-                )
-                comp_str += f'{" " * indent}{_comp_str}{nl * indented}'
+                return _expand(comp, indent, nl)
 
-        name = self.__class__.__name__
+        return "".join(_drive(expand(self, indent, "\n"), indent, expand))
 
-        attrs_str = f" id={render_var(self._id, True)}" if self._id else ""
+    def _iter_render(self, indent: int, nl: str) -> Iterator[Union[str, tuple]]:
+        # `nl` is what every newline of this element's own output turns into
+        # once all of its ancestors have indented it. Children are not rendered
+        # here; they are handed back to `_drive` as `(component, nl)` pairs.
+        yield self._open_tag(indent, nl)
+        yield from _iter_components(self._components, indent, nl)
+        yield nl + self._tag_close if indent > 0 else self._tag_close
+
+    def _open_tag(self, indent: int, nl: str) -> str:
+        if not (self._id or self._classes or self._attributes):
+            return f"{self._tag_open}>"
+
+        attrs_str = (
+            f" id={_render_value(self._id, indent, nl, True)}" if self._id else ""
+        )
         attrs_str += (
-            f" class={render_var(self._classes, True)}" if self._classes else ""
+            f" class={_render_value(self._classes, indent, nl, True)}"
+            if self._classes
+            else ""
         )
 
         for attr, val in self._attributes.items():
             attrs_str += (
                 f" {attr}"
                 if isinstance(val, bool)
-                else f" {attr}={render_var(val, True)}"
+                else f" {attr}={_render_value(val, indent, nl, True)}"
             )
 
-        return f"<{name}{attrs_str}>{comp_str}</{name}>"
+        return f"{self._tag_open}{attrs_str}>"
+
+    def compile(self, indent: int = 2) -> Template:
+        """Pre-render everything that does not depend on a `Var`.
 
-    def get_vars(self) -> Set[str]:
-        ret = set()
-        if isinstance(self._id, Var):
-            ret.add(self._id.name)
+        `compile(indent).render(values)` gives the same string as
+        `set_vars(values).render(indent)`, but only re-renders the variables.
+        """
+        return Template(
+            _drive(_expand_compiled(self, indent, "\n"), indent, _expand_compiled),
+            indent,
+        )
+
+    def render_many(
+        self,
+        values: Iterable[Dict[str, Any]],
+        indent: int = 2,
+        generator: bool = False,
+        executor: Optional["Executor"] = None,
+        chunksize: int = 100,
+    ) -> Union[List[str], Iterator[str]]:
+        """Render the element once for every dict of variable values.
 
-        if isinstance(self._classes, Var):
-            ret.add(self._classes.name)
+        Gives the same outputs as `set_vars(values).render(indent)` for each
+        item, but the static markup is rendered only once. See
+        `chope.compiled.render_many` for the options.
+        """
+        return render_many(self, values, indent, generator, executor, chunksize)
+
+    def _iter_compile(self, indent: int, nl: str) -> Iterator[Union[str, Hole, tuple]]:
+        # Same output as `_iter_render`, except that variables become holes.
+        indented = indent > 0
+        child_nl = nl + " " * indent if indented else ""
 
-        ret.update(
-            {val.name for val in self._attributes.values() if isinstance(val, Var)}
+        attrs = chain(
+            (("id", self._id, False),) if self._id else (),
+            (("class", self._classes, False),) if self._classes else (),
+            ((attr, val, True) for attr, val in self._attributes.items()),
         )
 
-        def get_var(comp):
-            if isinstance(comp, (Element, Css)):
-                return comp.get_vars()
+        tag = self._tag_open
+        for attr, val, can_be_flag in attrs:
+            if isinstance(val, (Element, Css, Var)):
+                yield f"{tag} {attr}="
+                yield _value_hole(val, indent, nl, True)
+                tag = ""
+            elif can_be_flag and isinstance(val, bool):
+                tag += f" {attr}"
+            else:
+                tag += f" {attr}={_render_value(val, indent, nl, True)}"
+
+        yield f"{tag}>"
+
+        for comp in self._components:
+            if isinstance(comp, str):
+                _comp = comp.replace("\n", "<br>")
+                yield f"{child_nl}{_comp}"
             elif isinstance(comp, Var):
-                if isinstance(comp.value, Var):
-                    return {comp.name}.union(get_var(comp.value))
-                elif isinstance(comp.value, (Element, Css)):
-                    return {comp.name}.union(comp.value.get_vars())
-                else:
-                    return {comp.name}
+                yield child_nl
+                yield _value_hole(comp, indent, nl)
+            elif comp.__class__ is Lazy:
+                # lazy components are read again on every render
+                yield _lazy_hole(comp, indent, nl)
             else:
-                return set()
+                yield child_nl
+                yield comp, child_nl
 
-        return ret.union(
-            reduce(lambda res, comp: res.union(get_var(comp)), self._components, set())
-        )
+        yield nl + self._tag_close if indented else self._tag_close
+
+    def get_vars(self) -> FrozenSet[str]:
+        """Names of all variables in the element and its descendants.
+
+        The set is computed once and cached until the components of the element
+        or of a descendant are replaced with `element[...]`.
+        """
+        if self._epoch != _tree_epoch:
+            _refresh(self)
+        if self._vars is None:
+            self._vars = frozenset(self._get_var_index())
+
+        return self._vars
 
     def set_vars(self, values_: Dict[str, Any] = {}, **kwargs) -> "Component":
         combined_values = {k: v for k, v in chain(values_.items(), kwargs.items())}
 
-        def set_var(comp: Component, values: Dict[str, Any]) -> Component:
-            if isinstance(comp, (Element, Css)):
-                return comp.set_vars(values)
-            elif isinstance(comp, Var):
-                new_var = comp.set_value(values)
-                if new_var == comp and isinstance(new_var.value, (Element, Css)):
-                    return Var(new_var.name, new_var.value.set_vars(values))
-                else:
-                    return new_var
-            else:
-                return comp
-
-        id = set_var(self._id, combined_values)
-        classes = set_var(self._classes, combined_values)
-        attributes = {
-            key: set_var(value, combined_values)
-            for key, value in self._attributes.items()
+        index = self._get_var_index()
+        slots = {
+            slot for name in combined_values if name in index for slot in index[name]
         }
-        components = tuple(set_var(comp, combined_values) for comp in self._components)
-
-        if (
-            id == self._id
-            and classes == self._classes
-            and attributes == self._attributes
-            and components == self._components
-        ):
+
+        # Only the slots that hold one of the variables are rebuilt; everything
+        # else is shared with the new element.
+        updates = {}
+        for slot in slots:
+            old = self._get_slot(slot)
+            new = _set_var(old, combined_values)
+            if new is not old:
+                updates[slot] = new
+
+        if not updates:
             return self
 
+        ret = self._copy()
+        components = list(self._components)
+        attributes = None
+
+        for (kind, key), value in updates.items():
+            if kind == "id":
+                ret._id = value
+            elif kind == "class":
+                ret._classes = value
+            elif kind == "attr":
+                if attributes is None:
+                    attributes = dict(self._attributes)
+                attributes[key] = value
+            else:
+                components[key] = value
+
+        ret._components = tuple(components)
+        if attributes is not None:
+            ret._attributes = attributes
+
+        return ret
+
+    def _get_var_index(self) -> Dict[str, Tuple[Tuple[str, Any], ...]]:
+        # Maps every variable name in this element to the slots (id, class,
+        # attribute or component) it appears under. Built once and cached.
+        if self._epoch != _tree_epoch:
+            _refresh(self)
+        if self._var_index is None:
+            index: Dict[str, list] = {}
+            for slot, value in self._iter_slots():
+                for name in _get_vars(value):
+                    index.setdefault(name, []).append(slot)
+
+            self._var_index = {name: tuple(slots) for name, slots in index.items()}
+
+        return self._var_index
+
+    def find_by_id(self, id: str) -> Optional["Element"]:
+        """The first element of the tree, this one included, with the given id."""
+        positions = self._get_index().by_id.get(id)
+        return self._get_index().elements[positions[0]] if positions else None
+
+    def find_all(
+        self,
+        tag: Union[str, Type["Element"], None] = None,
+        class_: Optional[str] = None,
+        attrs: Optional[Dict[str, Any]] = None,
+    ) -> List["Element"]:
+        """All elements of the tree matching a tag, classes and attributes.
+
+        `tag` is a tag name or an element class, `class_` one or more
+        space-separated classes, and `attrs` maps attribute names to their
+        values, or to `True` to only require the attribute.
+        """
+        index = self._get_index()
+        compound = Compound(
+            (tag if isinstance(tag, str) else tag._tag_name).lower() if tag else None,
+            None,
+            tuple(class_.split()) if class_ else (),
+            tuple(
+                (attr.lower(), None, None)
+                if value is True
+                else (attr.lower(), "=", str(value))
+                for attr, value in (attrs or {}).items()
+            ),
+            (),
+        )
+
+        return [index.elements[pos] for pos in index.match((("", compound),))]
+
+    def select(self, selector: str) -> List["Element"]:
+        """All elements of the tree matching a CSS selector, in document order.
+
+        See `chope.selector.parse_selector` for the supported selectors.
+        Elements inside `Lazy` and `Cached` components are not searched.
+        """
+        index = self._get_index()
+        return [index.elements[pos] for pos in index.select(selector)]
+
+    def render_partial(self, selector: str, indent: int = 2) -> str:
+        """Render only the elements matching `selector`, e.g. for HTMX responses.
+
+        Each match is rendered as if it were the root of the document.
+        """
+        sep = "\n" if indent > 0 else ""
+        return sep.join(element.render(indent) for element in self.select(selector))
+
+    def _get_index(self) -> TreeIndex:
+        # Built on first use and kept until the components of the element or
+        # of a descendant are replaced.
+        if self._epoch != _tree_epoch:
+            _refresh(self)
+        if self._index is None:
+            self._index = _build_index(self)
+
+        return self._index
+
+    def _iter_slots(self) -> Iterator[Tuple[Tuple[str, Any], Any]]:
+        yield ("id", None), self._id
+        yield ("class", None), self._classes
+        for key, value in self._attributes.items():
+            yield ("attr", key), value
+        for i, comp in enumerate(self._components):
+            yield ("comp", i), comp
+
+    def _get_slot(self, slot: Tuple[str, Any]) -> Any:
+        kind, key = slot
+        if kind == "id":
+            return self._id
+        elif kind == "class":
+            return self._classes
+        elif kind == "attr":
+            return self._attributes[key]
         else:
-            return self.__class__(id=id, class_=classes, **attributes)[components]
+            return self._components[key]
 
     def __str__(self) -> str:
         return self.render(0)
@@ -247,4 +623,620 @@ class Element:
         return self.__str__()
 
 
-Component = Union[str, Element, Css, Var]
+@lru_cache(maxsize=1024)
+def _parse_selector(selector: str) -> Tuple[str, str]:
+    id, classes = _SELECTOR_PATTERN.match(selector).groups()
+    return id or "", classes.replace(".", " ").strip() if classes else ""
+
+
+def _restore_element(
+    cls: Type[Element],
+    components: Tuple["Component", ...],
+    classes: Any,
+    id: Any,
+    attributes: Optional[Dict[str, Any]],
+) -> Element:
+    element = cls.__new__(cls)
+    element._components = components
+    element._classes = classes
+    element._id = id
+    element._attributes = attributes or _NO_ATTRIBUTES
+    element._var_index = None
+    element._vars = None
+    element._hash = None
+    element._index = None
+    element._lengths = None
+    element._epoch = None
+    return element
+
+
+class Lazy:
+    """Components that are only produced while the parent is being rendered.
+
+    `source` is either an iterable of components or a function returning
+    one. Nothing is read from it until rendering reaches it, so a generator
+    of rows is streamed without ever being held in memory. A generator can
+    only be rendered once; pass a function to render the same element again.
+
+    `source` may also be an asynchronous iterable, which can only be rendered
+    with `render_async()` or `aiter_render()`.
+
+    Variables inside lazy components are rendered with their current values
+    but are not seen by `get_vars()` or `set_vars()`.
+    """
+
+    __slots__ = ("_source",)
+
+    def __init__(
+        self, source: Union[Iterable["Component"], Callable[[], Iterable["Component"]]]
+    ) -> None:
+        self._source = source
+
+    def components(self) -> Iterator["Component"]:
+        source = self._open()
+        if not isinstance(source, Iterable):
+            raise TypeError(
+                "asynchronous components can only be rendered with render_async()"
+            )
+
+        return _flatten(source)
+
+    def _open(self) -> Any:
+        return self._source() if callable(self._source) else self._source
+
+    def _iter_render(self, indent: int, nl: str) -> Iterator[Union[str, tuple]]:
+        return _iter_components(self.components(), indent, nl)
+
+
+Component = Union[str, Element, Css, Var, Lazy, Cached]
+
+
+def _indent_newlines(text: str, nl: str) -> str:
+    return text if nl == "\n" or "\n" not in text else text.replace("\n", nl)
+
+
+def _iter_components(
+    components: Iterable[Component], indent: int, nl: str
+) -> Iterator[Union[str, tuple]]:
+    indented = indent > 0
+    child_nl = nl + " " * indent if indented else ""
+
+    for comp in components:
+        if isinstance(comp, str):
+            _comp = comp.replace("\n", "<br>")
+            yield f"{child_nl}{_comp}"
+        elif isinstance(comp, Var):
+            yield child_nl
+            yield from _iter_value(comp, indent, nl)
+        elif comp.__class__ is Lazy:
+            yield comp, nl
+        else:
+            yield child_nl
+            yield comp, child_nl
+
+
+def _expand(comp: Any, indent: int, nl: str) -> Iterator[Union[str, tuple]]:
+    if (
+        isinstance(comp, Element) and type(comp).render is Element.render
+    ) or isinstance(comp, (Css, Lazy, Cached)):
+        return comp._iter_render(indent, nl)
+    elif hasattr(comp, "__await__"):
+        raise TypeError(
+            f"awaitable {comp!r} can only be rendered with render_async()"
+        )
+    else:
+        # elements with a custom `render()` can only be rendered as a whole
+        return iter((_indent_newlines(comp.render(indent), nl),))
+
+
+def _expand_minified(comp: Any, indent: int, nl: str) -> Iterator[Union[str, tuple]]:
+    if isinstance(comp, Css):
+        return iter((comp.render(minify=True),))
+    elif isinstance(comp, Cached):
+        return comp._iter_render(indent, nl, True)
+    else:
+        return _expand(comp, indent, nl)
+
+
+def _expand_compiled(
+    comp: Any, indent: int, nl: str
+) -> Iterator[Union[str, Hole, tuple]]:
+    if (
+        isinstance(comp, Element) and type(comp).render is Element.render
+    ) or isinstance(comp, Css):
+        return comp._iter_compile(indent, nl)
+    elif isinstance(comp, Cached):
+        # cached fragments are looked up again on every render
+        return iter((_cached_hole(comp, indent, nl),))
+    elif isinstance(comp, Element) and comp.get_vars():
+        return iter((_element_hole(comp, indent, nl),))
+    else:
+        return _expand(comp, indent, nl)
+
+
+def _lazy_hole(comp: "Lazy", indent: int, nl: str) -> Hole:
+    return Hole(
+        (),
+        lambda values: "".join(_drive(comp._iter_render(indent, nl), indent)),
+        (_lazy_hole, (comp, indent, nl)),
+    )
+
+
+def _cached_hole(comp: Cached, indent: int, nl: str) -> Hole:
+    return Hole(
+        (),
+        lambda values: "".join(comp._iter_render(indent, nl)),
+        (_cached_hole, (comp, indent, nl)),
+    )
+
+
+def _element_hole(comp: Element, indent: int, nl: str) -> Hole:
+    # elements with a custom `render()` are rendered whole
+    return Hole(
+        comp.get_vars(),
+        lambda values: _indent_newlines(comp.set_vars(values).render(indent), nl),
+        (_element_hole, (comp, indent, nl)),
+    )
+
+
+def _drive(
+    items: Iterator[Union[str, tuple]],
+    indent: int,
+    expand: Callable[[Any, int, str], Iterator] = _expand,
+) -> Iterator[str]:
+    # Depth-first walk over an explicit stack of expansions, so each chunk is
+    # passed to the caller once, however deep in the tree it was produced.
+    stack = [items]
+    push = stack.append
+    pop = stack.pop
+
+    while stack:
+        for item in stack[-1]:
+            if item.__class__ is tuple:
+                push(expand(item[0], indent, item[1]))
+                break
+            else:
+                yield item
+        else:
+            pop()
+
+
+def _measure(root: Element, indent: int, minify: bool) -> int:
+    # Same walk as `_drive`. Every expansion on the stack has a frame of
+    # [element or None, nl, own chunks, static, bytes, newlines], where the
+    # counts are those of the children measured so far. The chunks of an
+    # element are only joined to be measured when it is left.
+    expand = _expand_minified if minify else _expand
+    key = (indent, minify)
+
+    if root._epoch != _tree_epoch:
+        _refresh(root)
+    lengths = root._lengths
+    if lengths is not None and key in lengths:
+        return lengths[key][0]
+
+    static = type(root).render is Element.render and not _has_own_vars(root)
+    chunks: List[str] = []
+    frames = [[root, "\n", chunks, static, 0, 0]]
+    stack = [expand(root, indent, "\n")]
+    size = 0
+
+    while stack:
+        frame = frames[-1]
+        for item in stack[-1]:
+            if item.__class__ is not tuple:
+                chunks.append(item)
+                continue
+
+            comp, nl = item
+            if isinstance(comp, Element):
+                if comp._epoch != _tree_epoch:
+                    _refresh(comp)
+                lengths = comp._lengths
+            else:
+                lengths = None
+            if lengths is not None and key in lengths:
+                # a static subtree, measured with "\n" as its newline
+                child_size, child_newlines = lengths[key]
+                frame[4] += child_size + child_newlines * (len(nl) - 1)
+                frame[5] += child_newlines
+                continue
+
+            if isinstance(comp, Element) and type(comp).render is Element.render:
+                static = not _has_own_vars(comp)
+                element = comp
+            else:
+                static = isinstance(comp, Css) and not comp.get_vars()
+                element = None
+            chunks = []
+            frames.append([element, nl, chunks, static, 0, 0])
+            stack.append(expand(comp, indent, nl))
+            break
+        else:
+            stack.pop()
+            element, nl, _, static, size, newlines = frames.pop()
+            text = "".join(chunks)
+            size += len(text) if text.isascii() else len(text.encode())
+            newlines += text.count("\n")
+
+            if static and element is not None:
+                if element._lengths is None:
+                    element._lengths = {}
+                element._lengths[key] = (size - newlines * (len(nl) - 1), newlines)
+
+            if frames:
+                parent = frames[-1]
+                parent[3] = parent[3] and static
+                parent[4] += size
+                parent[5] += newlines
+                chunks = parent[2]
+
+    return size
+
+
+def _refresh(element: Element) -> None:
+    # Drops the caches filled before the current epoch.
+    element._var_index = None
+    element._vars = None
+    element._index = None
+    element._lengths = None
+    element._epoch = _tree_epoch
+
+
+def _has_own_vars(element: Element) -> bool:
+    # Variables in the element's attributes and components, not in its
+    # children. Once `get_vars()` has been called the whole subtree is known.
+    if element._vars is not None:
+        return bool(element._vars)
+
+    for comp in element._components:
+        if isinstance(comp, Var):
+            return True
+
+    if element._attributes and any(map(_has_var, element._attributes.values())):
+        return True
+
+    return _has_var(element._id) or _has_var(element._classes)
+
+
+def _has_var(value: Any) -> bool:
+    if isinstance(value, Var):
+        return True
+    elif isinstance(value, (list, tuple)):
+        return any(_has_var(item) for item in value)
+    else:
+        return False
+
+
+def _render_chunk(components: Tuple[Component, ...], indent: int, nl: str) -> str:
+    return "".join(_drive(_iter_components(components, indent, nl), indent))
+
+
+def _iter_parallel(
+    element: Element, executor: "Executor", chunksize: int, indent: int, nl: str
+) -> Iterator[Union[str, tuple]]:
+    # Same output as `element._iter_render()`, with runs of picklable siblings
+    # submitted to the executor up front and collected in order.
+    items: List[Any] = []
+    run: List[Component] = []
+
+    def submit() -> None:
+        if run:
+            items.append(executor.submit(_render_chunk, tuple(run), indent, nl))
+            run.clear()
+
+    for comp in element._components:
+        if isinstance(comp, (Lazy, Cached)):
+            submit()
+            items.append(comp)
+        else:
+            run.append(comp)
+            if len(run) >= chunksize:
+                submit()
+    submit()
+
+    yield element._open_tag(indent, nl)
+    for item in items:
+        if isinstance(item, (Lazy, Cached)):
+            yield from _iter_components((item,), indent, nl)
+        else:
+            yield item.result()
+    yield nl + element._tag_close if indent > 0 else element._tag_close
+
+
+def _iter_value(
+    value: Any, indent: int, nl: str, quote_str: bool = False
+) -> Iterator[Union[str, tuple]]:
+    if isinstance(value, (Element, Css, Cached)):
+        yield value, nl + " " * indent
+    elif isinstance(value, Var):
+        yield from _iter_value(value.value, indent, nl, quote_str)
+    elif isinstance(value, str):
+        yield _indent_newlines(
+            f"'{value}'"
+            if '"' in value
+            else f'"{value}"'
+            if quote_str
+            else value,
+            nl,
+        )
+    elif isinstance(value, Iterable) or value.__class__ is Lazy:
+        sep = f'{nl * (indent > 0)}{" " * indent}'
+        items = value.components() if value.__class__ is Lazy else value
+        for i, item in enumerate(items):
+            if i:
+                yield sep
+            yield from _iter_value(item, indent, nl)
+    elif hasattr(value, "__await__"):
+        yield value, nl
+    else:
+        yield _indent_newlines(str(value), nl)
+
+
+def _render_value(value: Any, indent: int, nl: str, quote_str: bool = False) -> str:
+    if value.__class__ is str and "\n" not in value:
+        return (
+            f"'{value}'" if '"' in value else f'"{value}"' if quote_str else value
+        )
+    return "".join(_drive(_iter_value(value, indent, nl, quote_str), indent))
+
+
+def _value_hole(var: Component, indent: int, nl: str, quote_str: bool = False) -> Hole:
+    if var.__class__ is Var and (
+        var._value is None or var._value.__class__ in (str, int, float)
+    ):
+        # a variable with a plain default only needs its own value looked up
+        return _plain_var_hole(
+            var._name, _render_value(var, indent, nl, quote_str), indent, nl, quote_str
+        )
+
+    return Hole(
+        _get_vars(var),
+        lambda values: _render_value(_set_var(var, values), indent, nl, quote_str),
+        (_value_hole, (var, indent, nl, quote_str)),
+    )
+
+
+def _plain_var_hole(
+    name: str, default: str, indent: int, nl: str, quote_str: bool
+) -> Hole:
+    def fill(values: Dict[str, Any]) -> str:
+        if name not in values:
+            return default
+
+        value = values[name]
+        return _render_value(
+            value if value is not None else f"[{name} is not set]",
+            indent,
+            nl,
+            quote_str,
+        )
+
+    return Hole(
+        (name,), fill, (_plain_var_hole, (name, default, indent, nl, quote_str))
+    )
+
+
+def _get_vars(comp: Any) -> Set[str]:
+    if isinstance(comp, Element):
+        return comp.get_vars()
+    elif isinstance(comp, Css):
+        return comp.get_vars()
+    elif isinstance(comp, Var):
+        if isinstance(comp.value, (Var, Element, Css)):
+            return {comp.name}.union(_get_vars(comp.value))
+        else:
+            return {comp.name}
+    else:
+        return set()
+
+
+def _set_var(comp: Component, values: Dict[str, Any]) -> Component:
+    if isinstance(comp, (Element, Css)):
+        return comp.set_vars(values)
+    elif isinstance(comp, Var):
+        new_var = comp.set_value(values)
+        if new_var is comp and isinstance(new_var.value, (Element, Css)):
+            return Var(new_var.name, new_var.value.set_vars(values))
+        else:
+            return new_var
+    else:
+        return comp
+
+
+def _build_index(root: Element) -> TreeIndex:
+    index = TreeIndex()
+    stack: List[Tuple[Any, int]] = [(root, -1)]
+
+    while stack:
+        comp, parent = stack.pop()
+        if isinstance(comp, Element):
+            if comp._epoch != _tree_epoch:
+                _refresh(comp)
+            id = _index_value(comp._id)
+            classes = _index_value(comp._classes)
+            # `id` and `class` can also be matched as attributes
+            attributes = {"id": id} if id else {}
+            if classes:
+                attributes["class"] = classes
+            for attr, value in comp._attributes.items():
+                attributes[attr] = (
+                    "" if isinstance(value, bool) else _index_value(value)
+                )
+
+            pos = index.add(
+                comp, parent, comp._tag_name, id, tuple(classes.split()), attributes
+            )
+            stack.extend((child, pos) for child in reversed(comp._components))
+            if type(comp).render is not Element.render:
+                index.complete = False
+        elif isinstance(comp, Var):
+            stack.append((comp._value, parent))
+        elif isinstance(comp, (list, tuple)):
+            stack.extend((child, parent) for child in reversed(comp))
+        elif isinstance(comp, (Lazy, Cached)):
+            # only known when rendered
+            index.complete = False
+
+    return index
+
+
+def _index_value(value: Any) -> str:
+    while isinstance(value, Var):
+        value = value._value
+
+    if value is None:
+        return ""
+    elif isinstance(value, str):
+        return value
+    elif isinstance(value, Iterable):
+        return " ".join(_index_value(item) for item in value)
+    else:
+        return str(value)
+
+
+def _flatten(components: Iterable[Any]) -> Iterator[Any]:
+    for comp in components:
+        if isinstance(comp, str) or not isinstance(comp, Iterable):
+            yield comp
+        else:
+            yield from comp
+
+
+async def _aiter_components(
+    source: Any, indent: int, nl: str
+) -> AsyncIterator[Union[str, tuple]]:
+    async for comp in source:
+        comps = (
+            (comp,) if isinstance(comp, str) or not isinstance(comp, Iterable) else comp
+        )
+        for item in _iter_components(comps, indent, nl):
+            yield item
+
+
+def _schedule_awaitables(comp: Any, tasks: Dict[int, Tuple[Any, "asyncio.Future"]]):
+    # Starts every awaitable reachable without consuming iterators, so that
+    # independent values are fetched concurrently.
+    # Children are pushed in reverse so tasks start in document order.
+    import asyncio
+
+    stack = [comp]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, Element):
+            stack.extend(reversed(value._components))
+            stack.extend(reversed(list(value._attributes.values())))
+            stack.extend((value._classes, value._id))
+        elif isinstance(value, Var):
+            stack.append(value._value)
+        elif isinstance(value, (list, tuple)):
+            stack.extend(reversed(value))
+        elif hasattr(value, "__await__") and id(value) not in tasks:
+            tasks[id(value)] = (value, asyncio.ensure_future(value))
+
+
+def _get_task(
+    awaitable: Any, tasks: Dict[int, Tuple[Any, "asyncio.Future"]]
+) -> "asyncio.Future":
+    import asyncio
+
+    if id(awaitable) not in tasks:
+        tasks[id(awaitable)] = (awaitable, asyncio.ensure_future(awaitable))
+
+    return tasks[id(awaitable)][1]
+
+
+def _pending_attributes(
+    element: Element, tasks: Dict[int, Tuple[Any, "asyncio.Future"]]
+) -> Iterator[Tuple[Tuple[str, Any], "asyncio.Future", bool]]:
+    for slot, value in element._iter_slots():
+        if slot[0] == "comp":
+            break
+
+        in_var = isinstance(value, Var)
+        while isinstance(value, Var):
+            value = value._value
+
+        if hasattr(value, "__await__"):
+            yield slot, _get_task(value, tasks), in_var
+
+
+async def _resolve_attributes(
+    element: Element,
+    pending: List[Tuple[Tuple[str, Any], "asyncio.Future", bool]],
+) -> Element:
+    element = element._copy()
+    attributes = dict(element._attributes)
+
+    for (kind, key), future, in_var in pending:
+        value = await future
+        value = Var("", value) if in_var else value
+        if kind == "id":
+            element._id = value
+        elif kind == "class":
+            element._classes = value
+        else:
+            attributes[key] = value
+
+    element._attributes = attributes or _NO_ATTRIBUTES
+    return element
+
+
+async def _adrive(root: Any, indent: int) -> AsyncIterator[str]:
+    tasks: Dict[int, Tuple[Any, "asyncio.Future"]] = {}
+    buffer: List[str] = []
+    stack = [iter(((root, "\n"),))]
+
+    try:
+        _schedule_awaitables(root, tasks)
+
+        while stack:
+            top = stack[-1]
+            try:
+                item = (
+                    await top.__anext__() if hasattr(top, "__anext__") else next(top)
+                )
+            except (StopIteration, StopAsyncIteration):
+                stack.pop()
+                continue
+
+            if item.__class__ is not tuple:
+                buffer.append(item)
+                if len(buffer) >= _ASYNC_FLUSH_CHUNKS:
+                    yield "".join(buffer)
+                    buffer.clear()
+                continue
+
+            comp, nl = item
+            if hasattr(comp, "__await__"):
+                future = _get_task(comp, tasks)
+                if buffer and not future.done():
+                    # pass on what is ready before waiting for the value
+                    yield "".join(buffer)
+                    buffer.clear()
+                value = await future
+                _schedule_awaitables(value, tasks)
+                stack.append(_iter_value(value, indent, nl))
+            elif comp.__class__ is Lazy:
+                source = comp._open()
+                stack.append(
+                    _aiter_components(source, indent, nl)
+                    if hasattr(source, "__aiter__")
+                    else _iter_components(_flatten(source), indent, nl)
+                )
+            elif isinstance(comp, Element) and type(comp).render is Element.render:
+                pending = list(_pending_attributes(comp, tasks))
+                if pending:
+                    if buffer and not all(future.done() for _, future, _ in pending):
+                        yield "".join(buffer)
+                        buffer.clear()
+                    comp = await _resolve_attributes(comp, pending)
+                stack.append(comp._iter_render(indent, nl))
+            else:
+                stack.append(_expand(comp, indent, nl))
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        for _, future in tasks.values():
+            future.cancel()
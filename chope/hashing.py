@@ -0,0 +1,24 @@
+from typing import Any, Mapping
+
+
+def structural_hash(value: Any) -> int:
+    """Hash `value` by its content, consistently with `==`.
+
+    Lists, tuples, sets and mappings are hashed by their items. Other unhashable
+    values can only be told apart by `==`, so they hash by type alone.
+    """
+    if isinstance(value, (str, int, float)):
+        return hash(value)
+    elif isinstance(value, (list, tuple)):
+        return hash(tuple(structural_hash(item) for item in value))
+    elif isinstance(value, Mapping):
+        return hash(
+            frozenset((key, structural_hash(item)) for key, item in value.items())
+        )
+    elif isinstance(value, (set, frozenset)):
+        return hash(frozenset(structural_hash(item) for item in value))
+
+    try:
+        return hash(value)
+    except TypeError:
+        return hash(type(value))
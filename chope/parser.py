@@ -0,0 +1,247 @@
+import hashlib
+import re
+from html.parser import HTMLParser
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Type,
+    Union,
+)
+
+import chope
+from chope.cache import FragmentCache
+from chope.element import Component, Element
+
+# elements that never have content or an end tag
+VOID_TAGS = frozenset(
+    (
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "param",
+        "source",
+        "track",
+        "wbr",
+    )
+)
+
+# elements whose text is kept line by line instead of having its whitespace collapsed
+RAW_TEXT_TAGS = frozenset(("script", "style", "pre", "textarea"))
+
+_BLOCK_TAGS = frozenset(
+    "address article aside blockquote details div dl fieldset figcaption figure "
+    "footer form h1 h2 h3 h4 h5 h6 header hr main nav ol p pre section table ul".split()
+)
+
+# open elements that are closed by the start of another element
+IMPLIED_END_TAGS: Dict[str, FrozenSet[str]] = {
+    **{tag: frozenset(("p",)) for tag in _BLOCK_TAGS},
+    "li": frozenset(("li", "p")),
+    "dt": frozenset(("dt", "dd", "p")),
+    "dd": frozenset(("dt", "dd", "p")),
+    "tr": frozenset(("tr", "td", "th")),
+    "td": frozenset(("td", "th")),
+    "th": frozenset(("td", "th")),
+    "option": frozenset(("option",)),
+}
+
+_CHUNK_SIZE = 65536
+
+_WHITESPACE = re.compile(r"\s+")
+
+_tag_classes: Dict[str, Type[Element]] = {}
+
+default_cache = FragmentCache(maxsize=256)
+
+
+def element_class(tag: str) -> Type[Element]:
+    """The element class for a tag name.
+
+    Tags without a class in `chope` get an `Element` subclass named after
+    the tag, created once and reused.
+    """
+    cls = _tag_classes.get(tag)
+    if cls is None:
+        cls = getattr(chope, tag, None)
+        if not (isinstance(cls, type) and issubclass(cls, Element)) or cls is Element:
+            cls = type(tag, (Element,), {"__slots__": ()})
+            # found again through `tags` when unpickled
+            cls.__qualname__ = f"tags.{tag}"
+        cls = _tag_classes.setdefault(tag, cls)
+
+    return cls
+
+
+class _Tags:
+    """Namespace of the classes created by `element_class()`, by tag name."""
+
+    def __getattr__(self, tag: str) -> Type[Element]:
+        if tag.startswith("_"):
+            raise AttributeError(tag)
+
+        return element_class(tag)
+
+
+tags = _Tags()
+
+
+class HTMLImporter(HTMLParser):
+    """Incremental HTML to chope converter.
+
+    Call `feed()` with the input in as many pieces as needed and `close()` to
+    get the top-level components. Entities in text are kept as written, and
+    attribute values, which `HTMLParser` unescapes, are escaped again. Runs
+    of whitespace in text become one space. Elements left open are closed as
+    browsers do, at the start of an element that cannot be inside them or at
+    their parent's end tag. Comments and the doctype are dropped.
+
+    Text in `script`, `style`, `pre` and `textarea` is kept as one component
+    per line, so such elements should be rendered with an indent to keep
+    their line breaks.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self._stack: List[Tuple[str, List[Any], List[Component]]] = [("", [], [])]
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self._flush_text()
+        args = [
+            item
+            for name, value in attrs
+            for item in (name, True if value is None else _escape_attribute(value))
+        ]
+
+        closes = IMPLIED_END_TAGS.get(tag, ())
+        while self._stack[-1][0] in closes:
+            self._close_element()
+
+        if tag in VOID_TAGS:
+            self._stack[-1][2].append(element_class(tag)(*args))
+        else:
+            self._stack.append((tag, args, []))
+
+    def handle_startendtag(
+        self, tag: str, attrs: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush_text()
+        if self._stack[-1][0] == tag:
+            self._close_element()
+        elif any(open_tag == tag for open_tag, _, _ in self._stack[1:]):
+            while self._close_element() != tag:
+                pass
+
+    def handle_data(self, data: str) -> None:
+        self._text.append(data)
+
+    def handle_entityref(self, name: str) -> None:
+        self._text.append(f"&{name};")
+
+    def handle_charref(self, name: str) -> None:
+        self._text.append(f"&#{name};")
+
+    def close(self) -> List[Component]:
+        super().close()
+        self._flush_text()
+        while len(self._stack) > 1:
+            self._close_element()
+
+        return self._stack[0][2]
+
+    def _close_element(self) -> str:
+        tag, args, components = self._stack.pop()
+        element = element_class(tag)(*args)
+        # the components are already flat, so `__getitem__` is not needed
+        element._components = tuple(components)
+        self._stack[-1][2].append(element)
+        return tag
+
+    def _flush_text(self) -> None:
+        if not self._text:
+            return
+
+        text = "".join(self._text)
+        self._text = []
+
+        if self._stack[-1][0] in RAW_TEXT_TAGS:
+            # one component per line, since newlines in strings become <br>
+            lines = [line.rstrip() for line in text.split("\n")]
+            self._stack[-1][2].extend(line for line in lines if line.strip())
+        else:
+            text = _WHITESPACE.sub(" ", text)
+            if text != " ":
+                self._stack[-1][2].append(text)
+
+
+def parse_html(
+    source: Union[str, TextIO], cache: Optional[FragmentCache] = default_cache
+) -> Tuple[Component, ...]:
+    """Convert HTML into a tuple of chope components.
+
+    `source` is a string or a readable text stream, which is read in chunks.
+    Results are kept in `cache` under a hash of the HTML, so importing the
+    same HTML again costs reading and hashing it and copying the elements;
+    every import returns its own elements. Pass `cache=None` to always
+    parse, in which case a stream is parsed while it is read.
+    """
+    importer = HTMLImporter()
+
+    if cache is None:
+        for chunk in _read_chunks(source):
+            importer.feed(chunk)
+        return tuple(importer.close())
+
+    chunks = list(_read_chunks(source))
+    digest = hashlib.blake2b()
+    for chunk in chunks:
+        digest.update(chunk.encode())
+    key = digest.digest()
+
+    components = cache.get(key)
+    if components is None:
+        for chunk in chunks:
+            importer.feed(chunk)
+        components = tuple(importer.close())
+        cache.set(key, components)
+
+    # the cached elements are never handed out, so callers cannot change them
+    return tuple(_copy_tree(comp) for comp in components)
+
+
+def _copy_tree(comp: Component) -> Component:
+    if not isinstance(comp, Element):
+        return comp
+
+    element = comp._copy()
+    element._components = tuple(_copy_tree(child) for child in comp._components)
+    return element
+
+
+def _escape_attribute(value: str) -> str:
+    return value.replace("&", "&amp;").replace('"', "&quot;").replace("'", "&#39;")
+
+
+def _read_chunks(source: Union[str, TextIO]) -> Iterator[str]:
+    if isinstance(source, str):
+        return iter((source,))
+
+    return iter(lambda: source.read(_CHUNK_SIZE), "")
@@ -0,0 +1,197 @@
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from chope.element import Element, _index_value, _render_profiles
+from chope.variable import Var
+
+
+class RenderStats:
+    """Totals for the elements of one tag or one path.
+
+    `total_time` includes the children and `self_time` does not, both in
+    seconds. `bytes` is the length of the UTF-8 output, children included,
+    and `vars` the number of `Var` objects the elements looked up themselves.
+    """
+
+    __slots__ = ("calls", "total_time", "self_time", "bytes", "vars")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_time = 0.0
+        self.self_time = 0.0
+        self.bytes = 0
+        self.vars = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RenderProfile:
+    """Collects render statistics per tag and per path of tags, ids and classes.
+
+    Used as a context manager, the profile receives every `render()`,
+    `iter_render()` and `render_to()` call made inside the `with` block, in
+    the same thread or task. Times include whatever the caller does between
+    two chunks of `iter_render()`. Rendering outside a profile is not slowed
+    down.
+
+        with RenderProfile() as profile:
+            page.render()
+        print(profile.report())
+    """
+
+    def __init__(self) -> None:
+        self.by_tag: Dict[str, RenderStats] = {}
+        self.by_path: Dict[str, RenderStats] = {}
+        self._tokens: list = []
+
+    def __enter__(self) -> "RenderProfile":
+        profiles = _render_profiles.get()
+        self._tokens.append(_render_profiles.set(profiles + (self,)))
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        _render_profiles.reset(self._tokens.pop())
+
+    def as_dict(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return {
+            "tags": {tag: stats.as_dict() for tag, stats in self.by_tag.items()},
+            "paths": {path: stats.as_dict() for path, stats in self.by_path.items()},
+        }
+
+    def report(self, by: str = "tag", sort: str = "self_time", limit: int = 20) -> str:
+        """A table of the statistics by `"tag"` or `"path"`, largest `sort` first."""
+        if by not in ("tag", "path"):
+            raise ValueError(f"cannot report by {by!r}")
+        if sort not in RenderStats.__slots__:
+            raise ValueError(f"cannot sort by {sort!r}")
+
+        stats = self.by_tag if by == "tag" else self.by_path
+        rows = sorted(stats.items(), key=lambda item: -getattr(item[1], sort))
+        lines = [
+            f"{'calls':>8} {'total ms':>10} {'self ms':>10} {'bytes':>10} "
+            f"{'vars':>6}  {by}"
+        ]
+        for key, row in rows[:limit]:
+            lines.append(
+                f"{row.calls:>8} {row.total_time * 1e3:>10.3f} "
+                f"{row.self_time * 1e3:>10.3f} {row.bytes:>10} {row.vars:>6}  {key}"
+            )
+
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        self.by_tag.clear()
+        self.by_path.clear()
+
+    def _add(
+        self,
+        tag: str,
+        path: str,
+        outermost: bool,
+        total_time: float,
+        self_time: float,
+        size: int,
+        vars: int,
+    ) -> None:
+        for key, stats in ((tag, self.by_tag), (path, self.by_path)):
+            row = stats.get(key)
+            if row is None:
+                row = stats[key] = RenderStats()
+            row.calls += 1
+            row.self_time += self_time
+            row.vars += vars
+            # nested elements of the same tag are only counted once in totals
+            if outermost or stats is self.by_path:
+                row.total_time += total_time
+                row.bytes += size
+
+
+class _Frame:
+    __slots__ = ("tag", "path", "start", "child_time", "bytes", "vars")
+
+    def __init__(self, element: Element, parent: Optional["_Frame"], start: float):
+        self.tag = element._tag_name
+        label = self.tag
+        if element._id:
+            label += f"#{_index_value(element._id)}"
+        for cls in _index_value(element._classes).split():
+            label += f".{cls}"
+
+        self.path = f"{parent.path} > {label}" if parent is not None else label
+        self.start = start
+        self.child_time = 0.0
+        self.bytes = 0
+        self.vars = sum(
+            _count_vars(value)
+            for value in (
+                element._id,
+                element._classes,
+                *element._attributes.values(),
+                *element._components,
+            )
+        )
+
+
+def _count_vars(value: Any) -> int:
+    count = 0
+    while isinstance(value, Var):
+        count += 1
+        value = value._value
+    return count
+
+
+def _drive_profiled(
+    root: Element,
+    indent: int,
+    expand: Callable[[Any, int, str], Iterator],
+    profiles: Tuple[RenderProfile, ...],
+) -> Iterator[str]:
+    # Same walk as `chope.element._drive`, keeping a frame for every element
+    # on the stack. Output of other components counts towards the element
+    # they are in.
+    clock = time.perf_counter
+    frames: List[Optional[_Frame]] = [_Frame(root, None, clock())]
+    elements: List[_Frame] = [frames[0]]
+    open_tags: Dict[str, int] = {root._tag_name: 1}
+    stack = [expand(root, indent, "\n")]
+
+    while stack:
+        for item in stack[-1]:
+            if item.__class__ is tuple:
+                comp = item[0]
+                if isinstance(comp, Element):
+                    frame = _Frame(comp, elements[-1], clock())
+                    frames.append(frame)
+                    elements.append(frame)
+                    open_tags[frame.tag] = open_tags.get(frame.tag, 0) + 1
+                else:
+                    frames.append(None)
+                stack.append(expand(comp, indent, item[1]))
+                break
+            else:
+                elements[-1].bytes += len(item.encode())
+                yield item
+        else:
+            stack.pop()
+            frame = frames.pop()
+            if frame is None:
+                continue
+
+            elements.pop()
+            total_time = clock() - frame.start
+            open_tags[frame.tag] -= 1
+            if elements:
+                elements[-1].child_time += total_time
+                elements[-1].bytes += frame.bytes
+
+            for profile in profiles:
+                profile._add(
+                    frame.tag,
+                    frame.path,
+                    not open_tags[frame.tag],
+                    total_time,
+                    total_time - frame.child_time,
+                    frame.bytes,
+                    frame.vars,
+                )
@@ -0,0 +1,336 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from chope.css import Css
+
+
+class SelectorError(ValueError):
+    pass
+
+
+class Compound(NamedTuple):
+    """One compound selector, e.g. `a#top.nav[href]:hover`."""
+
+    tag: Optional[str]
+    id: Optional[str]
+    classes: Tuple[str, ...]
+    attributes: Tuple[Tuple[str, Optional[str], Optional[str]], ...]
+    pseudos: Tuple[str, ...]
+
+
+# a complex selector as (combinator, compound) pairs; the first combinator is ""
+Selector = Tuple[Tuple[str, Compound], ...]
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<space>\s*(?P<combinator>[>+~])\s*|\s+)
+    | (?P<tag>\*|[a-zA-Z][\w-]*)
+    | \#(?P<id>[\w-]+)
+    | \.(?P<cls>[\w-]+)
+    | \[\s*(?P<attr>[\w:-]+)\s*
+        (?:(?P<op>[~|^$*]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\s\]]+))
+        \s*(?:[iIsS]\s*)?)?\]
+    | (?P<pseudo>::?[\w-]+(?:\((?:[^()]|\([^()]*\))*\))?)
+    """,
+    re.VERBOSE,
+)
+
+
+@lru_cache(maxsize=16384)
+def parse_selector(text: str) -> Tuple[Selector, ...]:
+    """Parse a selector list such as `nav > a.active, #main p`.
+
+    Supports type, universal, id, class and attribute selectors, pseudo
+    classes and elements, and the descendant, `>`, `+` and `~` combinators.
+    Raises `SelectorError` for anything else.
+    """
+    return tuple(_parse_complex(part) for part in _split_list(text))
+
+
+def _split_list(text: str) -> List[str]:
+    # splits on the commas that are not inside brackets, parentheses or quotes
+    parts, depth, quote, start = [], 0, "", 0
+    for i, char in enumerate(text):
+        if quote:
+            quote = "" if char == quote else quote
+        elif char in "\"'":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+
+    return [part.strip() for part in parts]
+
+
+def _parse_complex(text: str) -> Selector:
+    if not text:
+        raise SelectorError("empty selector")
+
+    parts: List[Tuple[str, Compound]] = []
+    combinator = ""
+    compound: Dict[str, Any] = {}
+    pos = 0
+
+    def close() -> None:
+        nonlocal compound
+        if not compound:
+            raise SelectorError(f"invalid selector {text!r}")
+        parts.append(
+            (
+                combinator,
+                Compound(
+                    compound.get("tag"),
+                    compound.get("id"),
+                    tuple(compound.get("classes", ())),
+                    tuple(compound.get("attributes", ())),
+                    tuple(compound.get("pseudos", ())),
+                ),
+            )
+        )
+        compound = {}
+
+    while pos < len(text):
+        match = _TOKEN_PATTERN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise SelectorError(f"unsupported selector {text!r}")
+        pos = match.end()
+
+        if match.group("space") is not None:
+            close()
+            combinator = match.group("combinator") or " "
+        elif match.group("tag"):
+            if compound:
+                raise SelectorError(f"invalid selector {text!r}")
+            tag = match.group("tag").lower()
+            compound["tag"] = None if tag == "*" else tag
+        elif match.group("id"):
+            compound["id"] = match.group("id")
+        elif match.group("cls"):
+            compound.setdefault("classes", []).append(match.group("cls"))
+        elif match.group("attr"):
+            value = next(
+                (v for v in match.group("dq", "sq", "bare") if v is not None), None
+            )
+            compound.setdefault("attributes", []).append(
+                (match.group("attr").lower(), match.group("op"), value)
+            )
+        else:
+            compound.setdefault("pseudos", []).append(match.group("pseudo"))
+
+    close()
+    return tuple(parts)
+
+
+class TreeIndex:
+    """Positions of the elements of a tree, looked up by tag, id, class and attribute.
+
+    Elements are numbered in document order. `parents[i]` is the position of
+    the parent of element `i`, or -1 for the root. Tag and attribute names
+    are lowercase, as in HTML, and `id` and `class` are also attributes.
+    `complete` is false when part of the output is only known at render time,
+    from `Lazy` or `Cached` components or elements with a custom `render()`.
+    """
+
+    def __init__(self) -> None:
+        self.elements: List[Any] = []
+        self.parents: List[int] = []
+        self.tags: List[str] = []
+        self.ids: List[str] = []
+        self.classes: List[Tuple[str, ...]] = []
+        self.attributes: List[Dict[str, str]] = []
+        self.children: Dict[int, List[int]] = {}
+        self.sibling_positions: List[int] = []
+        self.by_tag: Dict[str, List[int]] = {}
+        self.by_id: Dict[str, List[int]] = {}
+        self.by_class: Dict[str, List[int]] = {}
+        self.by_attribute: Dict[str, List[int]] = {}
+        self.complete = True
+
+    def add(
+        self,
+        element: Any,
+        parent: int,
+        tag: str,
+        id: str,
+        classes: Tuple[str, ...],
+        attributes: Dict[str, str],
+    ) -> int:
+        pos = len(self.elements)
+        tag = tag.lower()
+        attributes = {attr.lower(): value for attr, value in attributes.items()}
+        self.elements.append(element)
+        self.parents.append(parent)
+        self.tags.append(tag)
+        self.ids.append(id)
+        self.classes.append(classes)
+        self.attributes.append(attributes)
+        siblings = self.children.setdefault(parent, [])
+        self.sibling_positions.append(len(siblings))
+        siblings.append(pos)
+
+        self.by_tag.setdefault(tag, []).append(pos)
+        if id:
+            self.by_id.setdefault(id, []).append(pos)
+        for cls in classes:
+            self.by_class.setdefault(cls, []).append(pos)
+        for attr in attributes:
+            self.by_attribute.setdefault(attr, []).append(pos)
+
+        return pos
+
+    def select(self, selector: str, pseudos: bool = False) -> Iterator[int]:
+        """Positions of the elements matching `selector`, in document order.
+
+        Pseudo-classes and pseudo-elements cannot be checked against a tree;
+        they raise `SelectorError` unless `pseudos` is true, in which case
+        they are assumed to match.
+        """
+        selectors = parse_selector(selector)
+        if not pseudos and any(
+            compound.pseudos for complex in selectors for _, compound in complex
+        ):
+            raise SelectorError(f"pseudo-classes are not supported: {selector!r}")
+
+        if len(selectors) == 1:
+            return self.match(selectors[0])
+
+        found = set()
+        for complex in selectors:
+            found.update(self.match(complex))
+        return iter(sorted(found))
+
+    def match(self, selector: Selector) -> Iterator[int]:
+        """Positions of the elements matching a parsed complex selector."""
+        if any(not self._candidates(compound) for _, compound in selector):
+            # a tag, id, class or attribute that is not in the tree at all
+            return iter(())
+
+        last = len(selector) - 1
+        compound = selector[last][1]
+        seen: Dict[Tuple[int, int], bool] = {}
+        return (
+            pos
+            for pos in self._candidates(compound)
+            if self._matches(pos, compound)
+            and self._matches_before(pos, selector, last, seen)
+        )
+
+    def _candidates(self, compound: Compound) -> List[int]:
+        # the shortest index list that every match has to be in
+        lists = []
+        if compound.id is not None:
+            lists.append(self.by_id.get(compound.id, []))
+        for cls in compound.classes:
+            lists.append(self.by_class.get(cls, []))
+        if compound.tag is not None:
+            lists.append(self.by_tag.get(compound.tag, []))
+        for attr, _, _ in compound.attributes:
+            lists.append(self.by_attribute.get(attr, []))
+
+        return min(lists, key=len) if lists else range(len(self.elements))
+
+    def _matches(self, pos: int, compound: Compound) -> bool:
+        if compound.tag is not None and self.tags[pos] != compound.tag:
+            return False
+        if compound.id is not None and self.ids[pos] != compound.id:
+            return False
+        if compound.classes and not all(
+            cls in self.classes[pos] for cls in compound.classes
+        ):
+            return False
+
+        attributes = self.attributes[pos]
+        for attr, op, expected in compound.attributes:
+            value = attributes.get(attr)
+            if value is None or not _matches_attribute(value, op, expected):
+                return False
+
+        return True
+
+    def _matches_before(
+        self, pos: int, selector: Selector, i: int, seen: Dict[Tuple[int, int], bool]
+    ) -> bool:
+        # Checks the compounds left of `selector[i]`, starting from `pos`.
+        # Results are kept in `seen`, as elements share their ancestors.
+        if i == 0:
+            return True
+
+        key = (pos, i)
+        if key in seen:
+            return seen[key]
+
+        combinator = selector[i][0]
+        compound = selector[i - 1][1]
+        found = False
+
+        if combinator in " >":
+            parent = self.parents[pos]
+            while parent >= 0:
+                if self._matches(parent, compound) and self._matches_before(
+                    parent, selector, i - 1, seen
+                ):
+                    found = True
+                    break
+                if combinator == ">":
+                    break
+                parent = self.parents[parent]
+        else:
+            siblings = self.children[self.parents[pos]]
+            before = siblings[: self.sibling_positions[pos]]
+            for sibling in reversed(before[-1:] if combinator == "+" else before):
+                if self._matches(sibling, compound) and self._matches_before(
+                    sibling, selector, i - 1, seen
+                ):
+                    found = True
+                    break
+
+        seen[key] = found
+        return found
+
+
+def _matches_attribute(value: str, op: Optional[str], expected: Optional[str]) -> bool:
+    if op is None:
+        return True
+    elif op == "=":
+        return value == expected
+    elif op == "~=":
+        return expected in value.split()
+    elif op == "|=":
+        return value == expected or value.startswith(f"{expected}-")
+    elif op == "^=":
+        return bool(expected) and value.startswith(expected)
+    elif op == "$=":
+        return bool(expected) and value.endswith(expected)
+    else:
+        return bool(expected) and expected in value
+
+
+def critical_css(tree: Any, css: Css) -> Css:
+    """Keep only the rules of `css` that can match an element of `tree`.
+
+    Pseudo-classes and pseudo-elements are assumed to match, and at-rules or
+    selectors that cannot be parsed are kept. When part of the tree is only
+    known at render time, from `Lazy` or `Cached` components or elements
+    with a custom `render()`, every rule is kept.
+    """
+    index = tree._get_index()
+    if not index.complete:
+        return Css(list(css._rules))
+
+    return Css([rule for rule in css._rules if _can_match(rule.name, index)])
+
+
+def _can_match(selector: str, index: TreeIndex) -> bool:
+    if selector.startswith("@"):
+        return True
+
+    try:
+        return any(True for _ in index.select(selector, pseudos=True))
+    except SelectorError:
+        return True
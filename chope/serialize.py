@@ -0,0 +1,114 @@
+import gc
+import io
+import mmap
+import os
+import pickle
+import sys
+from typing import IO, Any, Union
+
+from chope.cache import Cached
+from chope.css import Css, Rule, Unit
+from chope.element import Element, Lazy
+from chope.functions.function import Function
+from chope.compiled import Hole, Template
+from chope.variable import Var
+
+MAGIC = b"CHOPE\x01"
+
+# classes whose instances may be built when loading untrusted data
+_SAFE_BASES = (Element, Css, Rule, Var, Unit, Function, Template, Hole, Lazy, Cached)
+
+# functions the chope classes are rebuilt with
+_SAFE_FUNCTIONS = frozenset(
+    (
+        ("chope.element", "_restore_element"),
+        ("chope.element", "_value_hole"),
+        ("chope.element", "_plain_var_hole"),
+        ("chope.element", "_lazy_hole"),
+        ("chope.element", "_cached_hole"),
+        ("chope.element", "_element_hole"),
+        ("chope.css", "_restore_rule"),
+        ("chope.css", "_rule_hole"),
+        ("chope.compiled", "_restore_template"),
+        ("builtins", "set"),
+        ("builtins", "frozenset"),
+    )
+)
+
+
+class SerializationError(ValueError):
+    pass
+
+
+class _Unpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> Any:
+        if (module, name) in _SAFE_FUNCTIONS:
+            return super().find_class(module, name)
+
+        # only chope itself is imported; other classes must be imported already
+        if module != "chope" and not module.startswith("chope."):
+            if module not in sys.modules:
+                raise SerializationError(f"module {module!r} is not loaded")
+
+        obj = super().find_class(module, name)
+        if isinstance(obj, type) and issubclass(obj, _SAFE_BASES):
+            return obj
+
+        raise SerializationError(f"{module}.{name} is not allowed")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize elements, stylesheets, variables or compiled templates."""
+    return MAGIC + pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+
+
+def dump(obj: Any, file: Union[str, os.PathLike, IO[bytes]]) -> None:
+    """Write `dumps(obj)` to a path or a binary file."""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "wb") as fp:
+            dump(obj, fp)
+        return
+
+    file.write(MAGIC)
+    pickle.dump(obj, file, pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data: bytes, trusted: bool = False) -> Any:
+    """Rebuild an object serialized by `dumps()`.
+
+    Only chope classes, and `Element` subclasses from modules that are
+    already imported, can be loaded unless `trusted` is true. Data with
+    other contents, such as functions passed to `Lazy`, must come from a
+    trusted source, as loading it can run arbitrary code.
+    """
+    return _load(io.BytesIO(data), trusted)
+
+
+def load(file: Union[str, os.PathLike, IO[bytes]], trusted: bool = False) -> Any:
+    """Rebuild an object written by `dump()` to a path or a binary file.
+
+    A path is memory-mapped rather than read into memory first.
+    """
+    if not isinstance(file, (str, os.PathLike)):
+        return _load(file, trusted)
+
+    with open(file, "rb") as fp:
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return _load(mapped, trusted)
+
+
+def _load(file: Any, trusted: bool) -> Any:
+    if file.read(len(MAGIC)) != MAGIC:
+        raise SerializationError("not serialized by chope")
+
+    unpickler = pickle.Unpickler(file) if trusted else _Unpickler(file)
+
+    # a tree is many small objects that live on, which the cyclic garbage
+    # collector would otherwise scan again and again while they are created
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return unpickler.load()
+    finally:
+        if enabled:
+            gc.enable()
@@ -0,0 +1,127 @@
+import hashlib
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+from chope.css import Css, Rule, _property_groups
+from chope.element import Lazy
+
+
+class StyleRegistry:
+    """Collects the rules of the classes generated by `css()`.
+
+    Every distinct set of declarations is registered once, however many
+    elements use it. Used as a context manager, the registry receives the
+    classes generated by `css()` inside the `with` block, typically while
+    one page is built.
+    """
+
+    def __init__(self) -> None:
+        self._rules: Dict[str, Rule] = {}
+        self._texts: Dict[str, str] = {}
+        self._tokens: list = []
+
+    def register(self, declarations: Dict[str, Any]) -> str:
+        """Register a declarations dict and return its class name.
+
+        If the name is already taken by other declarations, a longer hash
+        is used for the new ones.
+        """
+        rule = Rule("", declarations)
+        block = _canonical_order(rule._minify()[1])
+        text = ";".join(f"{prop}:{value}" for prop, value in block.items())
+
+        size = 5
+        while True:
+            digest = hashlib.blake2b(text.encode(), digest_size=size).hexdigest()
+            name = f"css-{digest}"
+            known = self._texts.get(name)
+            if known is None:
+                self._texts[name] = text
+                self._rules[name] = Rule(f".{name}", block)
+                return name
+            if known == text:
+                return name
+            size += 5
+
+    def stylesheet(self) -> Css:
+        """The collected rules, in the order their classes were first used."""
+        return Css(list(self._rules.values()))
+
+    def inline(self) -> Lazy:
+        """A component rendering the collected stylesheet, e.g. in `style[...]`.
+
+        It is read at render time, so it can be placed in `head` before the
+        elements using the classes are built.
+        """
+        return Lazy(lambda: (self.stylesheet(),))
+
+    def render(self, indent: int = 2, minify: bool = False) -> str:
+        return self.stylesheet().render(indent, minify)
+
+    def render_to(self, fp: TextIO, indent: int = 2, minify: bool = False) -> None:
+        """Write the collected stylesheet, e.g. to an external `.css` file."""
+        fp.write(self.render(indent, minify))
+
+    def clear(self) -> None:
+        self._rules.clear()
+        self._texts.clear()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._rules
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rules)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def __enter__(self) -> "StyleRegistry":
+        self._tokens.append(_current_registry.set(self))
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        _current_registry.reset(self._tokens.pop())
+
+
+_current_registry: ContextVar[Optional[StyleRegistry]] = ContextVar(
+    "chope_style_registry", default=None
+)
+
+
+def css(*declarations: Dict[str, Any], registry: Optional[StyleRegistry] = None) -> str:
+    """Return a class name for the given declarations, registering its rule.
+
+    The name is a hash of the declarations, so equal declarations always get
+    the same class, whatever their order, unless the order matters, as for
+    `margin` and `margin-top`. Several dicts are merged, the later ones
+    winning. `Var` values are read when `css()` is called.
+
+    The rule is registered into `registry` or else the registry of the
+    enclosing `with StyleRegistry()` block; without either, `RuntimeError`
+    is raised.
+    """
+    merged: Dict[str, Any] = {}
+    for block in declarations:
+        merged.update(block)
+
+    if registry is None:
+        registry = _current_registry.get()
+    if registry is None:
+        raise RuntimeError(
+            "css() must be called inside a `with StyleRegistry()` block "
+            "or be given a registry"
+        )
+
+    return registry.register(merged)
+
+
+def _canonical_order(block: Dict[str, str]) -> Dict[str, str]:
+    # declarations are sorted unless two of them set the same thing
+    seen: set = set()
+    for prop in block:
+        groups = _property_groups(prop)
+        if ("*" in groups and len(block) > 1) or seen.intersection(groups):
+            return block
+        seen.update(groups)
+
+    return dict(sorted(block.items()))
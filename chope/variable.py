@@ -1,18 +1,32 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from chope.hashing import structural_hash
 
 
 class Var:
+    __slots__ = ("_name", "_value", "_hash")
+
     def __init__(self, name: str, value: Any = None) -> None:
         self._name = name
         self._value = value
+        self._hash: Optional[int] = None
 
     def __eq__(self, __value: object) -> bool:
-        return (
+        return self is __value or (
             isinstance(__value, Var)
             and self._name == __value._name
             and self._value == __value._value
         )
 
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash((Var, self._name, structural_hash(self._value)))
+
+        return self._hash
+
+    def __reduce__(self) -> tuple:
+        return self.__class__, (self._name, self._value)
+
     @property
     def name(self) -> str:
         return self._name
@@ -30,7 +44,7 @@ class Var:
                 if isinstance(self._value, Var)
                 else self._value
             )
-            if new_value != self._value:
+            if new_value is not self._value:
                 return Var(self._name, new_value)
             else:
                 return self
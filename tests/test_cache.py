@@ -0,0 +1,107 @@
+from chope import Element
+from chope.cache import Cached, FragmentCache
+from chope.css import Css
+from chope.variable import Var
+
+
+class a(Element):
+    pass
+
+
+class b(Element):
+    pass
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cached_fragment_should_render_same_as_subtree():
+    subtree = b["line 1", b["line 2"]]
+    store = FragmentCache()
+
+    comp = a[
+        "text",
+        Cached("nav", subtree, store=store),
+        Var("x", Cached("nav", subtree, store=store)),
+    ]
+    expected = a["text", subtree, Var("x", subtree)]
+
+    for indent in (2, 0, 4):
+        assert comp.render(indent) == expected.render(indent)
+        assert comp.render(indent) == expected.render(indent)
+
+
+def test_cached_fragment_should_not_call_factory_on_hit():
+    calls = []
+    store = FragmentCache()
+
+    def factory():
+        calls.append(1)
+        return b["expensive"]
+
+    comp = a[Cached("footer", factory, store=store)]
+
+    assert comp.render(0) == "<a><b>expensive</b></a>"
+    assert comp.render(0) == "<a><b>expensive</b></a>"
+    assert comp.compile(0).render() == "<a><b>expensive</b></a>"
+    assert len(calls) == 1
+    assert store.stats()["hits"] == 2
+    assert store.stats()["misses"] == 1
+
+
+def test_cached_fragment_should_be_keyed_on_indent():
+    store = FragmentCache()
+    comp = a[Cached("card", b["text"], store=store)]
+
+    comp.render(0)
+    comp.render(2)
+
+    assert len(store) == 2
+    assert store.misses == 2
+
+
+def test_cached_css_fragment():
+    store = FragmentCache()
+    css = Css["h1": dict(color="red")]
+
+    assert a[Cached("style", css, store=store)].render(2) == a[css].render(2)
+
+
+def test_store_should_evict_least_recently_used_fragment():
+    store = FragmentCache(maxsize=2)
+    store.set("a", "1")
+    store.set("b", "2")
+    store.get("a")
+
+    store.set("c", "3")
+
+    assert store.get("a") == "1"
+    assert store.get("b") is None
+    assert store.get("c") == "3"
+
+
+def test_store_should_expire_fragments_after_ttl():
+    timer = FakeTimer()
+    store = FragmentCache(ttl=10, timer=timer)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return b[str(len(calls))]
+
+    comp = a[Cached("ttl", factory, store=store)]
+
+    assert comp.render(0) == "<a><b>1</b></a>"
+    timer.now = 9
+    assert comp.render(0) == "<a><b>1</b></a>"
+    timer.now = 10
+    assert comp.render(0) == "<a><b>2</b></a>"
+
+    store.set("short", "x", ttl=1)
+    timer.now = 11
+    assert store.get("short") is None
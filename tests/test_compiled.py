@@ -0,0 +1,153 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from chope import Element
+from chope.css import Css, px
+from chope.compiled import Hole, Template
+from chope.variable import Var
+
+
+class a(Element):
+    pass
+
+
+class b(Element):
+    pass
+
+
+template = a(id=Var("id"), name="static")[
+    "Static text",
+    b[Var("content", "default")],
+    b(title=Var("title"))[
+        Var("inner", b[Var("nested")]),
+    ],
+    Css["h1": dict(color=Var("color", "red")), ".x": dict(margin=px / 1)],
+]
+
+
+@pytest.mark.parametrize("indent", (2, 0, 4))
+@pytest.mark.parametrize(
+    "values",
+    (
+        {},
+        {"id": "my-id", "content": "Content", "color": "blue"},
+        {"nested": "Nested", "title": 'say "hi"'},
+        {"inner": b["Replaced"], "content": "multi\nline"},
+    ),
+    ids=["no values", "some values", "nested values", "element values"],
+)
+def test_compiled_template_should_render_same_as_set_vars(indent: int, values: dict):
+    expected = template.set_vars(values).render(indent)
+
+    assert template.compile(indent).render(values) == expected
+
+
+def test_compiled_template_should_prerender_static_parts():
+    compiled = a["Static", b["text"], Var("content")].compile(0)
+
+    assert compiled.segments[0] == "<a>Static<b>text</b>"
+    assert isinstance(compiled.segments[1], Hole)
+    assert compiled.segments[2] == "</a>"
+
+
+def test_compiled_template_should_prioritise_kwargs_values():
+    compiled = a[Var("content")].compile(0)
+
+    assert compiled.render({"content": "dict"}, content="kwargs") == "<a>kwargs</a>"
+
+
+def test_compiled_template_should_list_variable_names():
+    assert template.compile().get_vars() == template.get_vars()
+
+
+def test_compile_element_with_custom_render():
+    class custom(Element):
+        def render(self, indent: int = 2) -> str:
+            return f"<custom>{self._components[0].value}</custom>"
+
+    comp = a[custom[Var("content")]]
+
+    assert comp.compile(0).render(content="x") == "<a><custom>x</custom></a>"
+
+
+def test_compile_css():
+    css = Css["h1": dict(color=Var("color")), ".my-class": Var("my-class")]
+    values = {"color": "blue", "my-class": {"background": "black"}}
+
+    compiled = css.compile(2)
+
+    assert isinstance(compiled, Template)
+    assert compiled.render(values) == css.set_vars(values).render(2)
+
+
+contexts = [
+    {"id": f"id-{i}", "content": f"Content {i}", "color": "blue" if i % 2 else "red"}
+    for i in range(20)
+]
+
+
+@pytest.mark.parametrize("indent", (2, 0))
+def test_render_many_should_render_same_as_set_vars(indent: int):
+    expected = [template.set_vars(values).render(indent) for values in contexts]
+
+    assert template.render_many(contexts, indent) == expected
+
+
+def test_render_many_should_return_generator():
+    outputs = template.render_many(iter(contexts), generator=True)
+
+    assert not isinstance(outputs, list)
+    assert next(outputs) == template.set_vars(contexts[0]).render()
+
+
+def test_render_many_should_render_static_template():
+    assert a["static"].render_many([{}, {"x": 1}], 0) == ["<a>static</a>"] * 2
+
+
+@pytest.mark.parametrize("executor_class", (ThreadPoolExecutor, ProcessPoolExecutor))
+def test_render_many_with_executor(executor_class):
+    expected = [template.set_vars(values).render() for values in contexts]
+
+    with executor_class(max_workers=2) as executor:
+        outputs = template.render_many(contexts, executor=executor, chunksize=3)
+
+    assert outputs == expected
+
+
+def test_render_many_with_executor_should_compile_once():
+    compiled = []
+
+    class counted(a):
+        def compile(self, indent=2):
+            compiled.append(indent)
+            return super().compile(indent)
+
+    source = counted[Var("x")]
+    values = [{"x": i} for i in range(10)]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        outputs = source.render_many(values, 0, executor=executor, chunksize=3)
+
+    assert outputs == [f"<counted>{i}</counted>" for i in range(10)]
+    assert compiled == [0]
+
+
+def test_css_render_many():
+    css = Css["h1": dict(color=Var("color")), ".x": dict(margin=px / 1)]
+    values = [{"color": "blue"}, {"color": "red"}, {}]
+
+    assert css.render_many(values) == [css.set_vars(v).render() for v in values]
+
+
+def test_template_render_bytes_and_render_into():
+    compiled = a(title=Var("title", "é"))["ünï", Var("content")].compile()
+    expected = compiled.render(content="ç").encode("utf-16")
+    buffer = bytearray()
+
+    assert compiled.render_bytes(content="ç", encoding="utf-16") == expected
+    assert compiled.render_bytes({"content": "x"}) == (
+        b'<a title="\xc3\xa9">\n  \xc3\xbcn\xc3\xaf\n  x\n</a>'
+    )
+    assert compiled.render_into(buffer, {"content": "ç"}) == len(buffer)
+    assert buffer == compiled.render(content="ç").encode()
@@ -1,3 +1,5 @@
+import io
+
 import pytest
 
 from chope.css import Css, RenderError, in_, percent, px, rem
@@ -107,3 +109,171 @@ def test_get_variable_names():
 )
 def test_comparison(input1, input2, expected):
     assert (input1 == input2) == expected
+
+def test_iter_render_should_stream_static_rules_as_one_chunk():
+    style = Css['a': dict(b='c'), 'd': dict(e='f'), 'g': dict(h=Var('h')), 'i': dict(j='k')]
+
+    chunks = list(style.iter_render(2))
+
+    assert len(chunks) == 3
+    assert ''.join(chunks) == style.render(2)
+
+def test_render_to_should_write_rendered_css_to_stream():
+    style = Css['a': dict(b='c'), 'd': dict(e='f')]
+    fp = io.StringIO()
+
+    style.render_to(fp, indent=0)
+
+    assert fp.getvalue() == 'a {b: c;}d {e: f;}'
+
+def test_get_variable_names_with_plain_declarations():
+    css = Css['h1': dict(color='red', size=Var('size'))]
+
+    assert css.get_vars() == {'size'}
+
+def test_set_vars_should_share_rules_without_variables():
+    css = Css['h1': dict(color='red'), 'h2': dict(color=Var('color'))]
+
+    new_css = css.set_vars({'color': 'blue'})
+
+    assert new_css._rules[0] is css._rules[0]
+    assert new_css.render(0) == 'h1 {color: red;}h2 {color: blue;}'
+    assert css.set_vars({'other': 'x'}) is css
+
+def test_set_vars_should_keep_unset_nested_variables():
+    css = Css[
+        'h1': dict(color=Var('color', Var('default_color', 'red'))),
+        '.my-class': Var('my-class')
+    ]
+
+    new_css = css.set_vars({'other': 'x'})
+
+    assert new_css == css
+    with pytest.raises(RenderError):
+        new_css.render()
+
+def test_get_vars_should_be_cached():
+    css = Css['h1': dict(color=Var('color')), '.my-class': Var('my-class')]
+
+    vars = css.get_vars()
+
+    assert isinstance(vars, frozenset)
+    assert css.get_vars() is vars
+
+def test_equal_css_should_have_equal_hashes():
+    css1 = Css['h1': dict(color=Var('color', 'red')), '.my-class': {'margin': (px/1, '0')}]
+    css2 = Css['h1': dict(color=Var('color', 'red')), '.my-class': {'margin': (px/1, '0')}]
+
+    assert hash(css1) == hash(css2)
+    assert {css1: 'cached'}[css2] == 'cached'
+
+def test_render_should_join_non_string_values():
+    css = Css['.my-class': dict(padding=(0, 0, px/20), margin=(Var('x', 1), 'auto'))]
+
+    assert css.render(0) == '.my-class {padding: 0 0 20px;margin: 1 auto;}'
+
+def test_render_should_normalize_properties_set_by_variable():
+    css = Css['h1': Var('decl', dict(font_size=px/2))]
+
+    assert css.render(0) == 'h1 {font-size: 2px;}'
+    assert css.set_vars({'decl': dict(line_height=1)}).render(0) == 'h1 {line-height: 1;}'
+
+def test_render_should_cache_rules_without_variables():
+    css = Css['h1': dict(color='red'), 'h2': dict(color=Var('color', 'blue'))]
+
+    static, variable = css._rules
+
+    assert static.render(2) is static.render(2)
+    assert list(css.iter_render(0))[0] is list(css.iter_render(0))[0]
+    assert css.set_vars({'color': 'green'}).render(0) == 'h1 {color: red;}h2 {color: green;}'
+    assert css.render(0) == 'h1 {color: red;}h2 {color: blue;}'
+
+def test_minify_should_strip_whitespace_and_trailing_semicolons():
+    css = Css['div  >  p , a': dict(color='red', margin=(px/1, 0)), 'h1': dict(font_size=rem/2)]
+
+    assert css.render(minify=True) == 'div>p,a{color:red;margin:1px 0}h1{font-size:2rem}'
+
+def test_minify_should_merge_rules_and_drop_overridden_properties():
+    css = Css[
+        'a': dict(color='red', margin='0'),
+        'b': dict(padding='0'),
+        'a': dict(color='blue', margin_top='1px'),
+        'c': dict(color='green !important'),
+        'c': dict(color='black'),
+    ]
+
+    assert css.render(minify=True) == (
+        'a{margin:0;color:blue;margin-top:1px}b{padding:0}c{color:green !important}'
+    )
+
+def test_minify_should_group_identical_blocks():
+    css = Css['a': dict(color='red'), 'b': dict(margin='0'), 'c': dict(color='red')]
+
+    assert css.render(minify=True) == 'a,c{color:red}b{margin:0}'
+
+def test_minify_should_not_move_rules_across_conflicting_rules():
+    css = Css[
+        'a': dict(color='red'),
+        'b': dict(color='blue'),
+        'a': dict(color='green'),
+        'c': dict(margin_top='1px'),
+        'd': dict(margin='0'),
+        'e': dict(margin_top='1px'),
+        '@font-face': dict(font_family='x'),
+        '@font-face': dict(font_family='y'),
+    ]
+
+    assert css.render(minify=True) == (
+        'a{color:red}b{color:blue}a{color:green}'
+        'c{margin-top:1px}d{margin:0}e{margin-top:1px}'
+        '@font-face{font-family:x}@font-face{font-family:y}'
+    )
+
+def test_minify_should_not_move_rules_across_shorthands_with_other_prefixes():
+    for shorthand, longhand in (
+        ('gap', 'row-gap'),
+        ('inset', 'top'),
+        ('place-items', 'align-items'),
+        ('font', 'line-height'),
+        ('columns', 'column-width'),
+        ('transition', '-webkit-transition'),
+        ('color', 'all'),
+    ):
+        css = Css['.a': {shorthand: '1'}, '.b': {longhand: '2'}, '.a': {shorthand: '3'}]
+
+        assert css.render(minify=True) == (
+            f'.a{{{shorthand}:1}}.b{{{longhand}:2}}.a{{{shorthand}:3}}'
+        )
+
+def test_minify_should_keep_quoted_attribute_values():
+    css = Css['a[title="x , y"]  >  b': dict(color='red'), "c[data-x='a  ~ b']": dict(margin=0)]
+
+    assert css.render(minify=True) == (
+        'a[title="x , y"]>b{color:red}c[data-x=\'a  ~ b\']{margin:0}'
+    )
+
+def test_minify_with_variables():
+    css = Css['a': dict(color=Var('color', 'red')), 'b': dict(color='blue')]
+
+    assert css.render(minify=True) == 'a{color:red}b{color:blue}'
+    assert css.set_vars({'color': 'blue'}).render(minify=True) == 'a,b{color:blue}'
+
+
+@pytest.mark.parametrize("indent", (2, 0))
+def test_render_length_should_match_encoded_output(indent):
+    css = Css["h1": dict(content='"é"', color=Var("color", "red")), "p": dict(a="b")]
+
+    for sheet in (css, css.set_vars({"color": "blue"})):
+        for minify in (False, True):
+            assert sheet.render_length(indent, minify) == len(
+                sheet.render(indent, minify).encode()
+            )
+
+
+def test_render_bytes_and_render_into():
+    css = Css["h1": dict(content='"é"', color=Var("color", "red")), "p": dict(a="b")]
+    buffer = bytearray()
+
+    assert css.render_bytes() == css.render().encode()
+    assert css.render_into(buffer, minify=True) == len(buffer)
+    assert buffer == css.render(minify=True).encode()
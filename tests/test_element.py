@@ -1,10 +1,14 @@
+import asyncio
+import io
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Tuple
 
 import pytest
 
 from chope import Element
 from chope.css import Css
-from chope.element import DuplicateAttributeError
+from chope.element import DuplicateAttributeError, Lazy
 from chope.variable import Var
 
 
@@ -242,3 +246,569 @@ def test_able_to_accept_empty_iterable_as_a_child():
     expected = '<a><b></b><b></b><b></b></a>'
 
     assert comp.render(0) == expected
+
+
+@pytest.mark.parametrize("indent", (2, 0))
+def test_iter_render_should_stream_same_output_as_render(indent: int):
+    expected = {
+        2: '<a title="x\ny">\n  text\n  <b>\n    line 1\n  line 2\n  </b>\n  <b>\n    inner\n  </b>\n  h1 {\n    color: red;\n  }\n</a>',
+        0: '<a title="x\ny">text<b>line 1line 2</b><b>inner</b>h1 {color: red;}</a>',
+    }[indent]
+
+    comp = a(title="x\ny")[
+        "text",
+        b[Var("multi", "line 1\nline 2")],
+        Var("inner", b["inner"]),
+        Css["h1": dict(color="red")],
+    ]
+
+    chunks = list(comp.iter_render(indent))
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == expected
+    assert comp.render(indent) == expected
+
+
+def test_render_to_should_write_rendered_element_to_stream():
+    comp = a["text", b["inner"]]
+    fp = io.StringIO()
+
+    comp.render_to(fp, indent=4)
+
+    assert fp.getvalue() == comp.render(4)
+
+
+def test_iter_render_should_use_overridden_render_of_custom_element():
+    class custom(Element):
+        def render(self, indent: int = 2) -> str:
+            return "<custom>\nline\n</custom>"
+
+    expected = "<a>\n  <custom>\n  line\n  </custom>\n</a>"
+
+    assert "".join(a[custom()].iter_render(2)) == expected
+
+
+def test_should_render_elements_nested_deeper_than_recursion_limit():
+    depth = 5000
+    comp = b["leaf"]
+    for _ in range(depth):
+        comp = a[comp]
+
+    flat = comp.render(0)
+    indented = comp.render(1)
+
+    assert flat == "<a>" * depth + "<b>leaf</b>" + "</a>" * depth
+    assert indented.splitlines()[depth] == f'{" " * depth}<b>'
+
+
+def test_set_vars_should_share_subtrees_without_variables():
+    static = b["static"]
+    dynamic = b[Var("inner")]
+    comp = a[static, a[dynamic, static]]
+
+    new_comp = comp.set_vars(inner="Inner")
+
+    assert new_comp._components[0] is static
+    assert new_comp._components[1]._components[1] is static
+    assert new_comp._components[1]._components[0] is not dynamic
+    assert new_comp.render(0) == "<a><b>static</b><a><b>Inner</b><b>static</b></a></a>"
+
+
+def test_set_vars_should_return_same_element_when_no_variable_is_set():
+    comp = a[b[Var("inner")]]
+
+    assert comp.set_vars(other="Other") is comp
+
+
+def test_set_vars_should_see_components_replaced_after_previous_call():
+    comp = a[Var("first")]
+    comp.set_vars(first="First")
+
+    comp[Var("second")]
+
+    assert comp.set_vars(second="Second").render(0) == "<a>Second</a>"
+
+
+def test_get_vars_should_be_cached_until_components_change():
+    comp = a(name=Var("name"))[Var("content")]
+
+    vars = comp.get_vars()
+
+    assert vars == {"name", "content"}
+    assert isinstance(vars, frozenset)
+    assert comp.get_vars() is vars
+
+    comp[Var("other")]
+
+    assert comp.get_vars() == {"name", "other"}
+    assert comp(title=Var("title")).get_vars() == {"name", "other", "title"}
+
+
+def test_set_vars_should_see_a_nested_child_filled_in_later():
+    content = c()
+    page = a[b["header"], b[content]]
+    page.get_vars()
+
+    content[b[Var("msg")]]
+
+    assert page.set_vars(msg="hello").render(0) == (
+        "<a><b>header</b><b><c><b>hello</b></c></b></a>"
+    )
+
+
+def test_get_vars_should_see_a_nested_child_filled_in_later():
+    content = c()
+    page = a[b[content]]
+    assert page.get_vars() == frozenset()
+
+    content[b[Var("msg")]]
+
+    assert page.get_vars() == {"msg"}
+
+
+def test_equal_elements_should_have_equal_hashes():
+    def make():
+        return a("#id.cls", title=Var("title", ["x", {"k": "v"}]))[
+            b["text"], Css["h1": dict(color="red")]
+        ]
+
+    comp1, comp2 = make(), make()
+
+    assert comp1 == comp2
+    assert hash(comp1) == hash(comp2)
+    assert {comp1: "cached"}[comp2] == "cached"
+
+
+def test_elements_with_different_content_or_tag_should_not_be_equal():
+    assert a["text"] != a["other"]
+    assert a["text"] != b["text"]
+    assert hash(a["text"]) != hash(a["other"])
+
+
+def test_hash_should_be_updated_when_components_change():
+    comp = a["text"]
+    old_hash = hash(comp)
+
+    comp["other"]
+
+    assert hash(comp) != old_hash
+    assert comp == a["other"]
+
+
+def test_equality_should_not_depend_on_stale_hash_of_mutated_child():
+    child = b["text"]
+    comp = a[child]
+    hash(comp)
+
+    child["other"]
+
+    assert comp == a[b["other"]]
+    assert Var("x", comp) == Var("x", a[b["other"]])
+
+
+def test_builtin_elements_should_not_allocate_instance_dict_or_empty_attributes():
+    from chope import div, span
+
+    comp1, comp2 = div["text"], span("#id.cls")["text"]
+
+    assert not hasattr(comp1, "__dict__")
+    assert comp1._attributes is comp2._attributes
+    assert comp1(title="x")._attributes == {"title": "x"}
+
+
+def test_lazy_components_should_render_same_as_eager_components():
+    rows = ["0", b["1"], Var("two", "2"), [b["3"], "4"]]
+
+    expected = a["head", *rows, "tail"].render()
+
+    assert a["head", Lazy(iter(rows)), "tail"].render() == expected
+    assert a[Var("rows", Lazy(rows[:3]))].render(0) == a[Var("rows", rows[:3])].render(0)
+
+
+def test_lazy_components_should_only_be_read_while_rendering():
+    read = []
+
+    def rows():
+        for i in range(3):
+            read.append(i)
+            yield b[str(i)]
+
+    chunks = a[Lazy(rows())].iter_render(0)
+
+    assert read == []
+    assert next(chunks) == "<a>"
+    assert "".join(chunks) == "<b>0</b><b>1</b><b>2</b></a>"
+    assert read == [0, 1, 2]
+
+
+def test_lazy_components_from_function_should_render_every_time():
+    comp = a[Lazy(lambda: (b[str(i)] for i in range(2)))]
+
+    assert comp.render(0) == comp.render(0) == "<a><b>0</b><b>1</b></a>"
+    assert comp.compile(0).render() == "<a><b>0</b><b>1</b></a>"
+
+
+def test_selector_parsing_should_be_cached():
+    from chope.element import _parse_selector
+
+    a("#cached-id.cached-class")
+    hits = _parse_selector.cache_info().hits
+
+    comp = a("#cached-id.cached-class")
+
+    assert _parse_selector.cache_info().hits == hits + 1
+    assert comp.render(0) == '<a id="cached-id" class="cached-class"></a>'
+
+
+def test_override_should_not_modify_original_element():
+    original = a("#id.cls", title="old")["Content"]
+
+    updated = original(title="new", class_="other")
+
+    assert original.render(0) == '<a id="id" class="cls" title="old">Content</a>'
+    assert updated.render(0) == '<a id="id" class="other" title="new">Content</a>'
+
+
+def test_render_async_should_await_variable_values_and_async_children():
+    async def value(x, delay=0.0):
+        await asyncio.sleep(delay)
+        return x
+
+    async def rows():
+        for i in range(2):
+            await asyncio.sleep(0)
+            yield b[str(i)]
+
+    def make():
+        return a(id=Var("id", value("my-id")), title=value("t"))[
+            Var("content", value(b["Content"])),
+            Var("nested", Var("inner", value("Inner"))),
+            rows(),
+            b[rows()],
+        ]
+
+    expected = a(id=Var("id", "my-id"), title="t")[
+        Var("content", b["Content"]),
+        Var("nested", Var("inner", "Inner")),
+        [b["0"], b["1"]],
+        b[[b["0"], b["1"]]],
+    ]
+
+    for indent in (2, 0):
+        assert asyncio.run(make().render_async(indent)) == expected.render(indent)
+
+
+def test_render_async_should_accept_a_bare_awaitable_child():
+    async def value(x):
+        await asyncio.sleep(0)
+        return x
+
+    async def render():
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(b["done"])
+        comps = [a[value(b["x"])], a[value("y"), "z"], a[future], a[[future]]]
+        return [await comp.render_async(0) for comp in comps]
+
+    assert asyncio.run(render()) == [
+        "<a><b>x</b></a>",
+        "<a>yz</a>",
+        "<a><b>done</b></a>",
+        "<a><b>done</b></a>",
+    ]
+
+
+def test_render_async_should_start_awaitables_concurrently():
+    events = []
+
+    async def value(name):
+        events.append(f"start {name}")
+        await asyncio.sleep(0.01)
+        events.append(f"end {name}")
+        return name
+
+    comp = a[Var("first", value("first")), b[Var("second", value("second"))]]
+
+    async def render():
+        chunks = comp.aiter_render(0)
+        first = await chunks.__anext__()
+        return first, first + "".join([chunk async for chunk in chunks])
+
+    first, result = asyncio.run(render())
+
+    assert first == "<a>"
+    assert result == "<a>first<b>second</b></a>"
+    assert events[:2] == ["start first", "start second"]
+
+
+def test_sync_render_should_reject_awaitables():
+    async def value():
+        return "x"
+
+    coroutine = value()
+    with pytest.raises(TypeError):
+        a[Var("x", coroutine)].render()
+    coroutine.close()
+
+    async def rows():
+        yield b["x"]
+
+    with pytest.raises(TypeError):
+        a[rows()].render()
+
+
+def test_element_should_pickle_without_cached_state():
+    comp = a("#id.class", title=Var("title", "x"), hidden=True)[
+        b["text", Var("content", b["nested"])],
+        Css["h1": dict(color=Var("color", "red"))],
+    ]
+    hash(comp)
+    comp.get_vars()
+
+    restored = pickle.loads(pickle.dumps(comp))
+
+    assert restored._hash is None
+    assert restored._vars is None
+    assert restored == comp
+    assert restored.render() == comp.render()
+
+
+def test_render_parallel_should_render_same_as_render():
+    rows = [b(id=f"row-{i}")[f"row {i}", Var("x", i)] for i in range(50)]
+    comp = a[
+        "head",
+        a[rows],
+        Lazy(["lazy 1", "lazy 2"]),
+        a[rows[:5]],
+    ]
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        for indent in (2, 0, 4):
+            expected = comp.render(indent)
+            actual = comp.render_parallel(executor, indent, threshold=10, chunksize=7)
+            assert actual == expected
+
+
+def test_render_parallel_should_render_small_trees_serially():
+    class RecordingExecutor(ThreadPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args, **kwargs):
+            self.submitted += 1
+            return super().submit(*args, **kwargs)
+
+    comp = a[[b[str(i)] for i in range(10)]]
+
+    with RecordingExecutor() as executor:
+        assert comp.render_parallel(executor, threshold=11) == comp.render()
+        assert executor.submitted == 0
+        assert comp.render_parallel(executor, threshold=10, chunksize=4) == comp.render()
+        assert executor.submitted == 3
+
+
+def test_render_should_minify_stylesheets():
+    comp = a[b[Css["h1": dict(color="red"), "h2": dict(color="red")]], "text"]
+
+    assert comp.render(0, minify=True) == "<a><b>h1,h2{color:red}</b>text</a>"
+    assert comp.render(2, minify=True) == (
+        "<a>\n  <b>\n    h1,h2{color:red}\n  </b>\n  text\n</a>"
+    )
+    assert comp.render(0) == "<a><b>h1 {color: red;}h2 {color: red;}</b>text</a>"
+
+
+def test_render_should_minify_stylesheets_in_cached_fragments():
+    from chope.cache import Cached, FragmentCache
+
+    store = FragmentCache()
+    css = Css["h1": dict(color="red"), "h2": dict(color="red")]
+    comp = a[Cached("style", b[css], store=store)]
+
+    assert comp.render(0) == "<a><b>h1 {color: red;}h2 {color: red;}</b></a>"
+    assert comp.render(0, minify=True) == "<a><b>h1,h2{color:red}</b></a>"
+    assert comp.render(0) == "<a><b>h1 {color: red;}h2 {color: red;}</b></a>"
+
+
+class c(Element):
+    pass
+
+
+def test_query_elements_by_id_tag_class_and_attributes():
+    field = c("#email.field.required", name="email")
+    page = a("#page")[
+        b(".form")[field, c(".field", name="name", disabled=True)],
+        b[Var("extra", c("#extra.field"))],
+    ]
+
+    assert page.find_by_id("email") is field
+    assert page.find_by_id("page") is page
+    assert page.find_by_id("missing") is None
+    assert page.find_by_id("extra").render(0) == '<c id="extra" class="field"></c>'
+
+    assert page.find_all(c) == [field, page._components[0]._components[1], page.find_by_id("extra")]
+    assert page.find_all("c", class_="field required") == [field]
+    assert page.find_all(attrs={"name": "name", "disabled": True}) == [
+        page._components[0]._components[1]
+    ]
+    assert page.find_all(tag="b", class_="missing") == []
+
+
+def test_select_elements():
+    page = a[b(".form")[c("#one"), c("#two", data_x="1")], b[c("#three")]]
+
+    assert [e._id for e in page.select(".form > c")] == ["one", "two"]
+    assert [e._id for e in page.select("c[data-x], #three")] == ["two", "three"]
+    assert [e._id for e in page.select("c + c")] == ["two"]
+
+    with pytest.raises(ValueError):
+        page.select("c:hover")
+
+
+def test_select_should_match_id_and_class_as_attributes():
+    page = a[b("#main.col-6.row")[c(".col-12")], b(id="other")]
+
+    assert [e._id for e in page.select("[id]")] == ["main", "other"]
+    assert [e._classes for e in page.select("[class^=col]")] == [
+        "col-6 row",
+        "col-12",
+    ]
+    assert page.select('[class~="row"]') == [page._components[0]]
+    assert [e._id for e in page.find_all(attrs={"id": "main"})] == ["main"]
+    assert len(page.find_all(tag="C", attrs={"CLASS": True})) == 1
+    assert len(page.select("B > C")) == 1
+
+
+def test_query_index_should_be_rebuilt_when_components_change():
+    page = a[b("#old")]
+    assert page.find_by_id("old") is not None
+
+    page[b("#new")]
+
+    assert page.find_by_id("old") is None
+    assert page.find_by_id("new") is not None
+
+
+def test_query_index_should_be_rebuilt_when_a_nested_child_changes():
+    nested = c()
+    page = a[b[nested]]
+    assert page.find_by_id("x") is None
+
+    nested[b("#x")["hi"]]
+
+    assert page.find_by_id("x") is nested._components[0]
+    assert page.select("c > b") == [nested._components[0]]
+
+
+def test_render_partial():
+    page = a[b("#list")[c["one"], c["two"]], b["other"]]
+
+    assert page.render_partial("#list", 0) == "<b id=\"list\"><c>one</c><c>two</c></b>"
+    assert page.render_partial("#list c", 2) == "<c>\n  one\n</c>\n<c>\n  two\n</c>"
+
+
+def test_tag_classes_should_be_created_once_on_first_use():
+    import chope
+
+    assert "section" in chope.__all__ and "Element" in chope.__all__
+    assert chope.section is chope.section
+    assert issubclass(chope.section, Element)
+    assert chope.section["x"].render(0) == "<section>x</section>"
+    assert chope.template.__name__ == "template"
+    assert pickle.loads(pickle.dumps(chope.td["x"])) == chope.td["x"]
+
+    with pytest.raises(AttributeError):
+        chope.not_a_tag
+
+
+def test_subclasses_should_render_their_own_tag_name():
+    class custom(a):
+        pass
+
+    assert custom._tag_close == "</custom>"
+    assert custom(id="x")[a()].render(0) == '<custom id="x"><a></a></custom>'
+
+
+@pytest.mark.parametrize("indent", (2, 0, 4))
+@pytest.mark.parametrize("minify", (False, True))
+def test_render_length_should_match_encoded_output(indent, minify):
+    comp = a("#id", title=Var("title", "é"))[
+        "ünïcode\ntext",
+        b[Var("content", b["nested"]), "static"],
+        b[b["deep"], Css["h1": dict(color="red", margin=0)]],
+        Lazy(lambda: [b["lazy"]]),
+    ]
+
+    for tree in (comp, comp.set_vars({"content": "✓", "title": "x"}), c[b[comp]]):
+        assert tree.render_length(indent, minify) == len(
+            tree.render(indent, minify).encode()
+        )
+
+
+def test_render_length_should_only_remeasure_dynamic_parts():
+    static = b[[b(class_="row")[str(i)] for i in range(10)]]
+    comp = a[static, Var("content", "x")]
+
+    assert comp.render_length() == len(comp.render().encode())
+    assert static._lengths is not None
+    assert comp._lengths is None
+
+    updated = comp.set_vars({"content": "a longer value"})
+    assert updated.render_length() == len(updated.render().encode())
+    assert c[static].render_length(0) == len(c[static].render(0))
+
+
+def test_render_length_should_be_remeasured_when_a_child_changes_in_place():
+    from chope import element
+
+    child = b["a"]
+    page = a[c[child]]
+    assert page.render_length() == len(page.render().encode())
+
+    epoch = element._tree_epoch
+    b["new"], a[b["elements"]]
+    assert element._tree_epoch == epoch
+
+    child["a much longer text now"]
+
+    assert page.render_length() == len(page.render().encode())
+    assert page.render_length(0) == len(page.render(0).encode())
+
+
+@pytest.mark.parametrize("encoding", ("utf-8", "utf-16", "latin-1"))
+def test_render_bytes_should_match_encoded_output(encoding):
+    comp = a("#id", title="é")[[b["ünï", Var("content", "ç")] for _ in range(600)]]
+
+    assert comp.render_bytes(encoding=encoding) == comp.render().encode(encoding)
+    assert comp.render_bytes(0, True) == comp.render(0, True).encode()
+
+
+def test_render_into_should_write_into_buffers():
+    import mmap
+
+    comp = a[[b["ünïcode", Var("x", "é")] for _ in range(600)]]
+    expected = comp.render().encode()
+
+    array = bytearray(b"head:")
+    assert comp.render_into(array) == len(expected)
+    assert array == b"head:" + expected
+
+    view = memoryview(bytearray(comp.render_length() + 3))
+    assert comp.render_into(view) == len(expected)
+    assert view.tobytes() == expected + bytes(3)
+
+    stream = io.BytesIO()
+    comp.render_into(stream)
+    assert stream.getvalue() == expected
+
+    with mmap.mmap(-1, len(expected)) as mm:
+        comp.render_into(mm)
+        assert mm[:] == expected
+        mm.seek(0)
+        comp.render_into(memoryview(mm))
+        assert mm[:] == expected
+
+
+def test_render_into_should_reject_unusable_buffers():
+    with pytest.raises(ValueError):
+        a["too long"].render_into(memoryview(bytearray(5)))
+
+    with pytest.raises(TypeError):
+        a["x"].render_into(b"immutable")
@@ -0,0 +1,116 @@
+import io
+
+from chope import Element, b, div, input, p, script
+from chope.cache import FragmentCache
+from chope.parser import HTMLImporter, element_class, parse_html
+from chope.variable import Var
+
+
+def test_parse_html_should_use_chope_tag_classes():
+    (comp,) = parse_html(
+        '<div id="main" class="a b" data-x="1">Hi <b>there</b></div>', cache=None
+    )
+
+    assert comp == div("#main.a.b", data_x="1")["Hi ", b["there"]]
+    assert type(comp) is div
+
+
+def test_parse_html_should_create_classes_for_unknown_tags():
+    (comp,) = parse_html("<my-widget size=2><del>x</del></my-widget>", cache=None)
+
+    assert type(comp) is element_class("my-widget")
+    assert issubclass(type(comp), Element)
+    assert comp.render(0) == '<my-widget size="2"><del>x</del></my-widget>'
+    assert element_class("div") is div
+
+
+def test_parse_html_should_keep_entities_and_collapse_whitespace():
+    (comp,) = parse_html("<p>\n  Tom &amp; Jerry&#33;\n  <b>hi</b>\n</p>", cache=None)
+
+    assert comp.render(0) == "<p> Tom &amp; Jerry&#33; <b>hi</b></p>"
+
+
+def test_parse_html_should_escape_attribute_values_again():
+    html = (
+        '<a title="say &quot;hi&quot; it&#39;s" href="?a=1&amp;b=2" '
+        "data-x='a \"b\"'>x</a>"
+    )
+
+    (comp,) = parse_html(html, cache=None)
+
+    assert comp.render(0) == (
+        '<a title="say &quot;hi&quot; it&#39;s" href="?a=1&amp;b=2" '
+        'data-x="a &quot;b&quot;">x</a>'
+    )
+    assert parse_html(comp.render(0), cache=None) == (comp,)
+
+
+def test_parse_html_should_handle_void_and_unclosed_elements():
+    comps = parse_html(
+        "<!DOCTYPE html><!-- note --><input type=checkbox checked><p>one<p>two"
+        "<ul><li>a<li>b</ul><br/>",
+        cache=None,
+    )
+
+    assert [comp.render(0) for comp in comps] == [
+        '<input type="checkbox" checked></input>',
+        "<p>one</p>",
+        "<p>two</p>",
+        "<ul><li>a</li><li>b</li></ul>",
+        "<br></br>",
+    ]
+
+
+def test_parse_html_should_keep_lines_of_scripts():
+    (comp,) = parse_html("<script>\n  var x = 1; // one\n  var y = 2;\n</script>")
+
+    assert comp == script["  var x = 1; // one", "  var y = 2;"]
+
+
+def test_imported_elements_can_hold_variables():
+    (comp,) = parse_html('<div class="card"><p>title</p></div>', cache=None)
+
+    page = comp[comp._components, p[Var("body", "default")]]
+
+    assert page.set_vars(body="text").render(0) == (
+        '<div class="card"><p>title</p><p>text</p></div>'
+    )
+
+
+def test_importer_should_accept_input_in_pieces():
+    importer = HTMLImporter()
+    for piece in ('<div id="a"><', 'b>te', "xt</b", "></div>"):
+        importer.feed(piece)
+
+    assert importer.close() == [div("#a")[b["text"]]]
+
+
+def test_parse_html_should_cache_by_content():
+    cache = FragmentCache()
+    html = "<div><input name=a></div>"
+
+    first = parse_html(html, cache=cache)
+
+    assert parse_html(html, cache=cache) == first
+    assert parse_html(io.StringIO(html), cache=cache) == first
+    assert cache.hits == 2
+    parse_html(html + " ", cache=cache)
+    assert cache.misses == 2
+    assert first == (div[input(name="a")],)
+
+
+def test_parse_html_should_return_new_elements_on_every_import():
+    cache = FragmentCache()
+    html = "<p>one<b>two</b></p>"
+
+    (first,) = parse_html(html, cache=cache)
+    first._components[1]["changed"]
+    first["also changed"]
+
+    comps = parse_html(html, cache=cache)
+    (second,) = comps
+
+    assert isinstance(comps, tuple)
+    assert second is not first
+    assert second == p["one", b["two"]]
+    assert cache.hits == 1
@@ -0,0 +1,83 @@
+import pytest
+
+from chope import Element
+from chope.css import Css
+from chope.element import Lazy
+from chope.profiling import RenderProfile
+from chope.variable import Var
+
+
+class a(Element):
+    pass
+
+
+class b(Element):
+    pass
+
+
+page = a("#top.page")[
+    Css["h1": dict(color="red")],
+    [b(title=Var("title", "t"))["é", Var("text", "x")] for _ in range(3)],
+    Lazy(lambda: [a[b["lazy"]]]),
+]
+
+
+@pytest.mark.parametrize("indent", (2, 0))
+def test_render_profile_should_not_change_output(indent):
+    with RenderProfile():
+        profiled = page.render(indent)
+        chunks = list(page.iter_render(indent))
+
+    assert profiled == page.render(indent)
+    assert "".join(chunks) == profiled
+
+
+def test_render_profile_should_collect_stats_per_tag_and_path():
+    with RenderProfile() as profile:
+        output = page.render()
+
+    tags = profile.as_dict()["tags"]
+    paths = profile.as_dict()["paths"]
+
+    assert tags["a"]["calls"] == 2
+    assert tags["b"]["calls"] == 4
+    assert tags["b"]["vars"] == 6
+    assert tags["a"]["bytes"] == len(output.encode())
+    assert paths["a#top.page"]["bytes"] == len(output.encode())
+    assert paths["a#top.page > b"]["calls"] == 3
+    assert paths["a#top.page > a > b"]["calls"] == 1
+
+    top = profile.by_path["a#top.page"]
+    assert top.total_time >= top.self_time >= 0
+    assert top.total_time >= profile.by_path["a#top.page > b"].total_time
+
+
+def test_render_profile_should_only_collect_inside_block():
+    profile = RenderProfile()
+    page.render()
+
+    with profile:
+        page.render()
+        with RenderProfile() as inner:
+            page.render()
+
+    page.render()
+
+    assert profile.by_tag["a"].calls == 4
+    assert inner.by_tag["a"].calls == 2
+
+
+def test_render_profile_report_should_sort_rows():
+    with RenderProfile() as profile:
+        page.render()
+
+    lines = profile.report(by="path", sort="calls").splitlines()
+
+    assert lines[0].split()[-1] == "path"
+    assert lines[1].startswith("       3") and lines[1].endswith("a#top.page > b")
+    assert len(profile.report(limit=1).splitlines()) == 2
+
+    with pytest.raises(ValueError):
+        profile.report(by="id")
+    with pytest.raises(ValueError):
+        profile.report(sort="name")
@@ -0,0 +1,130 @@
+import pytest
+
+from chope import Element
+from chope.css import Css
+from chope.selector import SelectorError, critical_css, parse_selector
+from chope.variable import Var
+
+
+class a(Element):
+    pass
+
+
+class b(Element):
+    pass
+
+
+class c(Element):
+    pass
+
+
+tree = a("#root.page")[
+    b(".nav.top")[c(href="/home", lang="en-US")["Home"], c(".active")["About"]],
+    b("#main", data_role="content")[
+        c["text"],
+        b(".card", title=Var("title", "card wide"))[c(hidden=True)],
+    ],
+]
+
+
+@pytest.mark.parametrize(
+    "selector, matches",
+    (
+        ("c", True),
+        ("#main", True),
+        (".nav.top", True),
+        ("a.page b.top > c.active", True),
+        ("#root > c", False),
+        ("b c", True),
+        (".card c[hidden]", True),
+        ("[data-role=content]", True),
+        ("c[href^='/ho']", True),
+        ("c[href$=home]", True),
+        ("c[href*=om]", True),
+        ('c[lang|="en"]', True),
+        ("b[title~=wide]", True),
+        ("c[href=/other]", False),
+        ("c + c.active", True),
+        ("c.active + c", False),
+        (".top ~ #main", True),
+        ("#main ~ .top", False),
+        (".missing", False),
+        ("section", False),
+        ("*", True),
+        ("[id=main]", True),
+        ("[id^=ro] > b", True),
+        ('[class*="ca"]', True),
+        ("c[class~=active]", True),
+        ("[class=nav]", False),
+        ("B.TOP", False),
+        ("A.page > B", True),
+        ("[DATA-ROLE]", True),
+        ("c:hover", True),
+        ("c::before, .missing", True),
+    ),
+)
+def test_critical_css_should_keep_rules_matching_the_tree(selector: str, matches: bool):
+    css = Css[selector: dict(color="red")]
+
+    assert critical_css(tree, css)._rules == (css._rules if matches else [])
+
+
+def test_critical_css_should_keep_at_rules_and_unsupported_selectors():
+    css = Css[
+        "@font-face": dict(font_family="x"),
+        "c:nth-child(2n + 1)": dict(color="red"),
+        "c ! b": dict(color="red"),
+        ".missing": dict(color="red"),
+    ]
+
+    assert [rule.name for rule in critical_css(tree, css)._rules] == [
+        "@font-face",
+        "c:nth-child(2n + 1)",
+        "c ! b",
+    ]
+
+
+def test_critical_css_should_keep_every_rule_when_output_is_only_known_at_render():
+    from chope.cache import Cached
+    from chope.element import Lazy
+
+    class custom(Element):
+        def render(self, indent: int = 2) -> str:
+            return '<div class="item"></div>'
+
+    css = Css[".item": dict(color="red"), ".missing": dict(color="red")]
+
+    for page in (
+        a[Lazy(lambda: [b(".item")])],
+        a[Cached("key", b(".item"))],
+        a[custom()],
+    ):
+        assert critical_css(page, css)._rules == css._rules
+
+    assert critical_css(a[b(".item")], css)._rules == css._rules[:1]
+
+
+def test_parse_selector():
+    (selector,) = parse_selector("a#x.y.z[href='a b'] > b:hover")
+
+    assert [combinator for combinator, _ in selector] == ["", ">"]
+    assert selector[0][1].tag == "a"
+    assert selector[0][1].id == "x"
+    assert selector[0][1].classes == ("y", "z")
+    assert selector[0][1].attributes == (("href", "=", "a b"),)
+    assert selector[1][1].pseudos == (":hover",)
+    assert len(parse_selector("a, [title='x, y'], b")) == 3
+
+    with pytest.raises(SelectorError):
+        parse_selector("a >")
+
+
+def test_critical_css_should_see_children_added_after_indexing():
+    nested = b()
+    page = a[nested]
+    css = Css[".late": dict(color="red")]
+    assert critical_css(page, css)._rules == []
+
+    nested[c(".late")]
+
+    assert critical_css(page, css)._rules == css._rules
@@ -0,0 +1,114 @@
+import io
+import os
+import pickle
+
+import pytest
+
+from chope import Element
+from chope.css import Css, Rule, px
+from chope.element import Lazy
+from chope.parser import parse_html
+from chope.serialize import MAGIC, SerializationError, dump, dumps, load, loads
+from chope.variable import Var
+
+
+class a(Element):
+    pass
+
+
+class b(Element):
+    pass
+
+
+def rows():
+    return [b["lazy"]]
+
+
+tree = a("#main.page", title=Var("title", "x"), hidden=True)[
+    "text",
+    b[Var("content", b["nested"]), Var("count", 1)],
+    Css[
+        "h1": dict(color=Var("color", "red"), font_size=px / 2),
+        ".x": dict(margin=(px / 1, "auto")),
+    ],
+]
+
+
+def test_loads_should_restore_elements():
+    hash(tree)
+    tree.get_vars()
+
+    restored = loads(dumps(tree))
+
+    assert restored._hash is None
+    assert restored == tree
+    assert type(restored) is a
+    assert restored.render() == tree.render()
+    assert restored.set_vars({"count": 5}).render() == tree.set_vars(
+        {"count": 5}
+    ).render()
+
+
+@pytest.mark.parametrize(
+    "obj",
+    (
+        Var("x", [1, 2]),
+        Rule("h1", dict(font_size=px / 2)),
+        Css["h1": dict(color=Var("color", "red"))],
+    ),
+)
+def test_loads_should_restore_css_and_variables(obj):
+    restored = loads(dumps(obj))
+
+    assert restored == obj
+    assert pickle.loads(pickle.dumps(obj)) == obj
+
+
+@pytest.mark.parametrize("indent", (2, 0))
+def test_loads_should_restore_compiled_templates(indent):
+    compiled = tree.compile(indent)
+    values = {"title": "y", "content": "z", "color": "blue"}
+
+    restored = loads(dumps(compiled))
+
+    assert restored.indent == indent
+    assert restored.render() == compiled.render()
+    assert restored.render(values) == compiled.render(values)
+    assert pickle.loads(pickle.dumps(compiled)).render(values) == compiled.render(
+        values
+    )
+
+
+def test_load_should_read_files_and_paths(tmp_path):
+    path = tmp_path / "tree.chope"
+    dump(tree, path)
+    buffer = io.BytesIO()
+    dump(tree, buffer)
+    buffer.seek(0)
+
+    assert load(path) == tree
+    assert load(os.fspath(path)) == tree
+    assert load(buffer) == tree
+    assert path.read_bytes().startswith(MAGIC)
+
+
+def test_loads_should_restore_parsed_tags():
+    comps = parse_html("<my-card><p>hi</p></my-card>", cache=None)
+
+    restored = loads(dumps(comps))
+
+    assert type(restored[0]) is type(comps[0])
+    assert restored == comps
+
+
+def test_loads_should_reject_untrusted_data():
+    with pytest.raises(SerializationError):
+        loads(MAGIC + pickle.dumps(os.system))
+    with pytest.raises(SerializationError):
+        loads(pickle.dumps(tree))
+
+    data = dumps(a[Lazy(rows)])
+    with pytest.raises(SerializationError):
+        loads(data)
+
+    assert loads(data, trusted=True).render(0) == "<a><b>lazy</b></a>"
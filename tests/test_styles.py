@@ -0,0 +1,130 @@
+import io
+
+from chope import Element
+from chope.css import px
+import pytest
+
+from chope.styles import StyleRegistry, css
+from chope.variable import Var
+
+
+class a(Element):
+    pass
+
+
+class b(Element):
+    pass
+
+
+def test_css_should_return_stable_class_names():
+    registry = StyleRegistry()
+
+    name = css(dict(color="red", font_size=px / 2), registry=registry)
+
+    assert name.startswith("css-")
+    assert css({"color": "red", "font-size": "2px"}, registry=registry) == name
+    assert css(dict(color="blue"), registry=registry) != name
+
+
+def test_class_names_should_not_depend_on_declaration_order():
+    registry = StyleRegistry()
+
+    name = css(dict(color="red", margin=0), registry=registry)
+    same = css(dict(margin=0, color="red"), registry=registry)
+    longhand_last = css(dict(margin=0, margin_top=px / 1), registry=registry)
+    longhand_first = css(dict(margin_top=px / 1, margin=0), registry=registry)
+
+    assert same == name
+    assert longhand_last != longhand_first
+    assert registry.render(minify=True) == (
+        f".{name}{{color:red;margin:0}}"
+        f".{longhand_last}{{margin:0;margin-top:1px}}"
+        f".{longhand_first}{{margin-top:1px;margin:0}}"
+    )
+
+
+def test_registry_should_dedupe_declarations():
+    registry = StyleRegistry()
+
+    names = [css(dict(color="red"), registry=registry) for _ in range(10)]
+    other = css(dict(color="red"), dict(margin=0), registry=registry)
+
+    assert len(registry) == 2
+    assert registry.render(minify=True) == (
+        f".{names[0]}{{color:red}}.{other}{{color:red;margin:0}}"
+    )
+
+
+def test_css_should_merge_declarations_and_read_variables():
+    registry = StyleRegistry()
+
+    name = css(
+        dict(color="red", margin=0), dict(color=Var("color", "blue")), registry=registry
+    )
+
+    assert registry.render(0) == f".{name} {{color: blue;margin: 0;}}"
+
+
+def test_registry_should_be_used_within_with_block():
+    with StyleRegistry() as registry:
+        name = css(dict(padding=px / 4))
+
+        with StyleRegistry() as inner:
+            css(dict(padding=0))
+
+    assert list(registry) == [name]
+    assert len(inner) == 1
+
+    with pytest.raises(RuntimeError):
+        css(dict(padding=px / 4))
+
+
+def test_inline_stylesheet_should_collect_classes_used_after_it():
+    with StyleRegistry() as registry:
+        page = a[
+            b[registry.inline()],
+            b(class_=css(dict(color="red")))["one"],
+            b(class_=css(dict(color="red")))["two"],
+        ]
+
+    name = next(iter(registry))
+    assert page.render(0, minify=True) == (
+        f'<a><b>.{name}{{color:red}}</b>'
+        f'<b class="{name}">one</b><b class="{name}">two</b></a>'
+    )
+
+
+def test_render_to_should_write_external_stylesheet():
+    registry = StyleRegistry()
+    name = css(dict(color="red"), registry=registry)
+    fp = io.StringIO()
+
+    registry.render_to(fp, minify=True)
+
+    assert fp.getvalue() == f".{name}{{color:red}}"
+
+
+def test_register_should_lengthen_names_that_collide(monkeypatch):
+    import hashlib
+    import types
+
+    import chope.styles
+
+    def blake2b(data: bytes, digest_size: int):
+        # every short hash collides
+        if digest_size == 5:
+            data = b""
+        return hashlib.blake2b(data, digest_size=digest_size)
+
+    monkeypatch.setattr(chope.styles, "hashlib", types.SimpleNamespace(blake2b=blake2b))
+    registry = StyleRegistry()
+
+    red = css(dict(color="red"), registry=registry)
+    blue = css(dict(color="blue"), registry=registry)
+
+    assert red != blue
+    assert len(blue) > len(red)
+    assert css(dict(color="blue"), registry=registry) == blue
+    assert registry.render(0, minify=True) == (
+        f".{red}{{color:red}}.{blue}{{color:blue}}"
+    )
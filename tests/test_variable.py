@@ -0,0 +1,17 @@
+from chope import Element
+from chope.variable import Var
+
+
+class a(Element):
+    pass
+
+
+def test_equal_variables_should_have_equal_hashes():
+    assert Var("name", a["text"]) == Var("name", a["text"])
+    assert hash(Var("name", a["text"])) == hash(Var("name", a["text"]))
+    assert hash(Var("name", [1, 2])) == hash(Var("name", [1, 2]))
+
+
+def test_variables_with_different_values_should_not_be_equal():
+    assert Var("name", "value") != Var("name", "other")
+    assert Var("name", "value") != Var("other", "value")